@@ -1,10 +1,13 @@
 from flask import Flask
 from flask_cors import CORS
 
+from .cli import migrate_command
 from .config import load_config
-from .database import init_db
+from .database import get_db, init_db
 from .routes.auth_routes import auth_bp
+from .routes.health_routes import health_bp
 from .routes.project_routes import project_bp
+from .schema import ensure_schema, pending_migrations
 
 
 def create_app() -> Flask:
@@ -16,8 +19,27 @@ def create_app() -> Flask:
         JWT_SECRET=config.jwt_secret,
         JWT_ALGORITHM=config.jwt_algorithm,
         JWT_ACCESS_TOKEN_EXPIRES_DAYS=config.jwt_access_token_expires_days,
+        WORKER_POOL_SIZE=config.worker_pool_size,
+        MONGODB_MAX_POOL_SIZE=config.mongodb_max_pool_size,
+        MONGODB_MIN_POOL_SIZE=config.mongodb_min_pool_size,
+        MONGODB_CONNECT_TIMEOUT_MS=config.mongodb_connect_timeout_ms,
+        MONGODB_SERVER_SELECTION_TIMEOUT_MS=config.mongodb_server_selection_timeout_ms,
+        MONGODB_SOCKET_TIMEOUT_MS=config.mongodb_socket_timeout_ms,
+        MONGODB_WAIT_QUEUE_TIMEOUT_MS=config.mongodb_wait_queue_timeout_ms,
+        MONGODB_READ_PREFERENCE=config.mongodb_read_preference,
     )
     init_db(app)
+    # Indexes and other quick migrations are applied here, once per process,
+    # so request handlers never issue DDL. Data migrations rewrite stored
+    # documents and are left to `flask --app main migrate`.
+    with app.app_context():
+        ensure_schema(get_db())
+        pending = [m.version for m in pending_migrations(get_db()) if m.data]
+    if pending:
+        app.logger.warning(
+            "Pending data migrations %s; run `flask --app main migrate`.", pending
+        )
+    app.cli.add_command(migrate_command)
 
     # Allow cross-origin requests from the frontend dev server.
     # In production, set CORS_ORIGINS env var to your actual domain(s).
@@ -32,6 +54,7 @@ def create_app() -> Flask:
     )
 
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
+    app.register_blueprint(health_bp, url_prefix="/api/health")
     app.register_blueprint(project_bp, url_prefix="/api/project")
     return app
 
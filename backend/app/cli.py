@@ -0,0 +1,19 @@
+import click
+from flask.cli import with_appcontext
+
+from .database import get_db
+from .schema import MigrationLockedError, migrate
+
+
+@click.command("migrate")
+@with_appcontext
+def migrate_command() -> None:
+    """Apply pending schema and data migrations."""
+    try:
+        versions = migrate(get_db())
+    except MigrationLockedError:
+        raise click.ClickException("Another process is applying migrations; try again later.")
+    if versions:
+        click.echo(f"Applied migrations: {', '.join(map(str, versions))}")
+    else:
+        click.echo("Schema is up to date.")
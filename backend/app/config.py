@@ -14,6 +14,14 @@ class Config:
     hf_token: str | None
     hf_embedding_model: str
     hf_chat_model: str
+    worker_pool_size: int
+    mongodb_max_pool_size: int | None
+    mongodb_min_pool_size: int | None
+    mongodb_connect_timeout_ms: int | None
+    mongodb_server_selection_timeout_ms: int | None
+    mongodb_socket_timeout_ms: int | None
+    mongodb_wait_queue_timeout_ms: int | None
+    mongodb_read_preference: str | None
 
 
 def load_config() -> Config:
@@ -26,6 +34,18 @@ def load_config() -> Config:
     hf_token = os.environ.get("HF_TOKEN")
     hf_embedding_model = os.environ.get("HF_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
     hf_chat_model = os.environ.get("HF_CHAT_MODEL", "google/gemma-3-27b-it:featherless-ai")
+    worker_pool_size = int(os.environ.get("WORKER_POOL_SIZE", os.cpu_count() or 1))
+    # Connection pool options. Unset ones are left to the URI's query string
+    # and pymongo's defaults.
+    mongodb_max_pool_size = _optional_int(os.environ.get("MONGODB_MAX_POOL_SIZE"))
+    mongodb_min_pool_size = _optional_int(os.environ.get("MONGODB_MIN_POOL_SIZE"))
+    mongodb_connect_timeout_ms = _optional_int(os.environ.get("MONGODB_CONNECT_TIMEOUT_MS"))
+    mongodb_server_selection_timeout_ms = _optional_int(
+        os.environ.get("MONGODB_SERVER_SELECTION_TIMEOUT_MS")
+    )
+    mongodb_socket_timeout_ms = _optional_int(os.environ.get("MONGODB_SOCKET_TIMEOUT_MS"))
+    mongodb_wait_queue_timeout_ms = _optional_int(os.environ.get("MONGODB_WAIT_QUEUE_TIMEOUT_MS"))
+    mongodb_read_preference = os.environ.get("MONGODB_READ_PREFERENCE") or None
     return Config(
         mongodb_uri=mongodb_uri,
         mongodb_db=mongodb_db,
@@ -35,5 +55,17 @@ def load_config() -> Config:
         hf_token=hf_token,
         hf_embedding_model=hf_embedding_model,
         hf_chat_model=hf_chat_model,
+        worker_pool_size=worker_pool_size,
+        mongodb_max_pool_size=mongodb_max_pool_size,
+        mongodb_min_pool_size=mongodb_min_pool_size,
+        mongodb_connect_timeout_ms=mongodb_connect_timeout_ms,
+        mongodb_server_selection_timeout_ms=mongodb_server_selection_timeout_ms,
+        mongodb_socket_timeout_ms=mongodb_socket_timeout_ms,
+        mongodb_wait_queue_timeout_ms=mongodb_wait_queue_timeout_ms,
+        mongodb_read_preference=mongodb_read_preference,
     )
 
+
+def _optional_int(value: str | None) -> int | None:
+    return int(value) if value else None
+
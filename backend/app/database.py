@@ -1,15 +1,125 @@
-from typing import Any
+import atexit
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Optional
 
-from flask import Flask, current_app, g
-from pymongo import MongoClient
+from flask import Flask, current_app
+from pymongo import MongoClient, monitoring
+
+
+@dataclass(frozen=True)
+class MongoSettings:
+    uri: str
+    max_pool_size: Optional[int] = None
+    min_pool_size: Optional[int] = None
+    connect_timeout_ms: Optional[int] = None
+    server_selection_timeout_ms: Optional[int] = None
+    socket_timeout_ms: Optional[int] = None
+    wait_queue_timeout_ms: Optional[int] = None
+    read_preference: Optional[str] = None
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool counters of the process-wide client: connections open
+    and checked out right now, and the number of checkouts with the time
+    spent waiting for them.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._open = 0
+            self._checked_out = 0
+            self._checkouts = 0
+            self._checkout_failures = 0
+            self._wait_seconds = 0.0
+            self._max_wait_seconds = 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            attempts = self._checkouts + self._checkout_failures
+            return {
+                "open_connections": self._open,
+                "checked_out": self._checked_out,
+                "checkouts": self._checkouts,
+                "checkout_failures": self._checkout_failures,
+                "wait_ms_total": self._wait_seconds * 1000,
+                "wait_ms_mean": self._wait_seconds * 1000 / attempts if attempts else 0.0,
+                "wait_ms_max": self._max_wait_seconds * 1000,
+            }
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self._lock:
+            self._open += 1
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self._lock:
+            self._open -= 1
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        with self._lock:
+            self._checked_out += 1
+            self._checkouts += 1
+            self._wait_seconds += event.duration
+            self._max_wait_seconds = max(self._max_wait_seconds, event.duration)
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        with self._lock:
+            self._checkout_failures += 1
+            self._wait_seconds += event.duration
+            self._max_wait_seconds = max(self._max_wait_seconds, event.duration)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        with self._lock:
+            self._checked_out -= 1
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        pass
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+
+# One client per process and settings, shared by every request and thread.
+# A client inherited across fork() is not safe to use, so pre-fork worker
+# processes detect the pid change and build their own; see get_client.
+_clients: dict[MongoSettings, MongoClient] = {}
+_clients_pid: Optional[int] = None
+_clients_lock = threading.Lock()
+_pool_metrics = PoolMetrics()
 
 
 def get_client() -> MongoClient:
-    client = getattr(g, "_mongo_client", None)
-    if client is None:
-        uri = current_app.config["MONGODB_URI"]
-        client = MongoClient(uri)
-        g._mongo_client = client
+    global _clients_pid
+    settings: MongoSettings = current_app.extensions["mongo"]
+    client = _clients.get(settings) if _clients_pid == os.getpid() else None
+    if client is not None:
+        return client
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            # Dropped without close(): the sockets belong to the parent.
+            _clients.clear()
+            _pool_metrics.reset()
+            _clients_pid = os.getpid()
+        client = _clients.get(settings)
+        if client is None:
+            client = _clients[settings] = _create_client(settings)
     return client
 
 
@@ -19,10 +129,49 @@ def get_db() -> Any:
     return client[name]
 
 
+def get_pool_metrics() -> dict[str, Any]:
+    """Connection pool counters of this process's clients."""
+    return _pool_metrics.snapshot()
+
+
+def close_clients() -> None:
+    with _clients_lock:
+        if _clients_pid == os.getpid():
+            for client in _clients.values():
+                client.close()
+        _clients.clear()
+
+
+atexit.register(close_clients)
+
+
 def init_db(app: Flask) -> None:
-    @app.teardown_appcontext
-    def close_db(_: Any) -> None:
-        client = getattr(g, "_mongo_client", None)
-        if client is not None:
-            client.close()
+    app.extensions["mongo"] = MongoSettings(
+        uri=app.config["MONGODB_URI"],
+        max_pool_size=app.config["MONGODB_MAX_POOL_SIZE"],
+        min_pool_size=app.config["MONGODB_MIN_POOL_SIZE"],
+        connect_timeout_ms=app.config["MONGODB_CONNECT_TIMEOUT_MS"],
+        server_selection_timeout_ms=app.config["MONGODB_SERVER_SELECTION_TIMEOUT_MS"],
+        socket_timeout_ms=app.config["MONGODB_SOCKET_TIMEOUT_MS"],
+        wait_queue_timeout_ms=app.config["MONGODB_WAIT_QUEUE_TIMEOUT_MS"],
+        read_preference=app.config["MONGODB_READ_PREFERENCE"],
+    )
+
 
+def _create_client(settings: MongoSettings) -> MongoClient:
+    # Only the options that were configured are passed, since keyword
+    # options override those given in the URI.
+    options = {
+        "maxPoolSize": settings.max_pool_size,
+        "minPoolSize": settings.min_pool_size,
+        "connectTimeoutMS": settings.connect_timeout_ms,
+        "serverSelectionTimeoutMS": settings.server_selection_timeout_ms,
+        "socketTimeoutMS": settings.socket_timeout_ms,
+        "waitQueueTimeoutMS": settings.wait_queue_timeout_ms,
+        "readPreference": settings.read_preference,
+    }
+    return MongoClient(
+        settings.uri,
+        event_listeners=[_pool_metrics],
+        **{name: value for name, value in options.items() if value is not None},
+    )
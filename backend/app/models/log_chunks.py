@@ -0,0 +1,234 @@
+import json
+import zlib
+from typing import Any, Callable, Optional
+
+from bson import Binary
+
+try:
+    import zstandard
+except ImportError:  # chunks are written with zlib when zstandard is not installed
+    zstandard = None
+
+
+# Version tag stored on every columnar chunk document. Chunks tagged with a
+# LEGACY_ENCODINGS tag still decode, and a schema migration re-encodes them:
+# columnar-1 kept every field in the compressed block, columnar-2 also kept
+# id, ts, level, category and message uncompressed, one document per entry.
+ENCODING = "columnar-3"
+LEGACY_ENCODINGS = ("columnar-1", "columnar-2")
+
+# Entry fields with a column of their own, in the order entries are rebuilt.
+# A field only gets a column when every entry of the chunk carries it with a
+# value of the column's type; anything else is kept per entry in `extra`.
+# ts, level and category are not in the block but in the chunk's filter
+# arrays (see encode_entries).
+_DELTA_COLUMNS = ("id", "template_id")
+_DICTIONARY_COLUMNS = ("date", "time")
+_COLUMN_ORDER = ("id", "date", "time", "ts", "level", "category", "message", "template_id")
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+_COMPRESSORS: dict[str, Callable[[bytes], bytes]] = {
+    "none": lambda data: data,
+    "zlib": lambda data: zlib.compress(data, ZLIB_LEVEL),
+}
+_DECOMPRESSORS: dict[str, Callable[[bytes], bytes]] = {
+    "none": lambda data: data,
+    "zlib": zlib.decompress,
+}
+if zstandard is not None:
+    _COMPRESSORS["zstd"] = lambda data: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    _DECOMPRESSORS["zstd"] = lambda data: zstandard.ZstdDecompressor().decompress(data)
+
+DEFAULT_CODEC = "zstd" if zstandard is not None else "zlib"
+
+
+def encode_entries(entries: list[dict[str, Any]], codec: str = DEFAULT_CODEC) -> dict[str, Any]:
+    """
+    Encodes a chunk of entries for storage. The fields the logs page filters
+    on in the database are kept uncompressed as parallel arrays, one item
+    per entry: `ts_offsets` from the chunk's `ts_base` (small enough to be
+    stored as 32-bit integers), and `level_codes`/`category_codes` indexing
+    the chunk's distinct `levels`/`categories`; None where an entry has no
+    such value. Everything else, messages included, is encoded column by
+    column (ids and template ids as deltas from the previous value,
+    date/time as a per-chunk dictionary plus codes) into one block
+    compressed with `codec`, so the chunk document no longer repeats field
+    names for every entry.
+
+    Returns the fields to store on the chunk document: `encoding`, `codec`,
+    `columns` (the block) and the filter arrays with their dictionaries.
+    """
+    if codec not in _COMPRESSORS:
+        raise ValueError(f"Unknown chunk codec {codec!r}")
+    levels, level_codes = _code_values(entries, "level")
+    categories, category_codes = _code_values(entries, "category")
+    timestamps = [entry.get("ts") if _is_int(entry.get("ts")) else None for entry in entries]
+    ts_base = min((ts for ts in timestamps if ts is not None), default=0)
+
+    columns: dict[str, Any] = {"count": len(entries)}
+    for name in _COLUMN_ORDER:
+        if name in _FILTER_FIELDS:
+            continue
+        values = [entry.get(name) for entry in entries]
+        if not all(name in entry for entry in entries):
+            continue
+        if name in _DELTA_COLUMNS and all(_is_int_or_none(value) for value in values):
+            columns[name] = _delta_encode(values)
+        elif name in _DICTIONARY_COLUMNS and all(_is_str_or_none(value) for value in values):
+            columns[name] = _dictionary_encode(values)
+        elif name == "message" and all(isinstance(value, str) for value in values):
+            columns[name] = values
+    encoded = set(columns) - {"count"}
+    extra = {}
+    for position, entry in enumerate(entries):
+        rest = {
+            key: value
+            for key, value in entry.items()
+            if key not in encoded and not _in_filter_arrays(key, value)
+        }
+        if rest:
+            extra[str(position)] = rest
+    if extra:
+        columns["extra"] = extra
+
+    block = json.dumps(columns, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return {
+        "encoding": ENCODING,
+        "codec": codec,
+        "columns": Binary(_COMPRESSORS[codec](block)),
+        "ts_base": ts_base,
+        "ts_offsets": [None if ts is None else ts - ts_base for ts in timestamps],
+        "levels": levels,
+        "level_codes": level_codes,
+        "categories": categories,
+        "category_codes": category_codes,
+    }
+
+
+def decode_entries(chunk: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    The entries of a chunk document, in id order. Chunks written before the
+    columnar encoding keep their entries as a plain `entries` list.
+    """
+    encoding = chunk.get("encoding")
+    if encoding != ENCODING and encoding not in LEGACY_ENCODINGS:
+        return chunk.get("entries") or []
+    decompress = _DECOMPRESSORS.get(chunk.get("codec", "none"))
+    if decompress is None:
+        raise ValueError(f"Chunk codec {chunk.get('codec')!r} is not available")
+    columns = json.loads(decompress(bytes(chunk["columns"])))
+    count = columns["count"]
+
+    decoded: dict[str, list[Any]] = {}
+    for name in _COLUMN_ORDER:
+        column = columns.get(name)
+        if column is None:
+            continue
+        if isinstance(column, dict):
+            decoded[name] = [column["values"][code] for code in column["codes"]]
+        elif name in _DELTA_COLUMNS or name == "ts":
+            # columnar-1 blocks delta-encode ts as well.
+            decoded[name] = _delta_decode(column)
+        else:
+            decoded[name] = column
+    if encoding == ENCODING:
+        base = chunk["ts_base"]
+        decoded["ts"] = [
+            _MISSING if offset is None else base + offset for offset in chunk["ts_offsets"]
+        ]
+        decoded["level"] = _decode_values(chunk["levels"], chunk["level_codes"])
+        decoded["category"] = _decode_values(chunk["categories"], chunk["category_codes"])
+    index = chunk.get("index") or [{} for _ in range(count)]
+
+    entries = []
+    for position in range(count):
+        row = index[position]
+        entry = {}
+        for name in _COLUMN_ORDER:
+            if name in row:
+                entry[name] = row[name]
+            elif name in decoded and decoded[name][position] is not _MISSING:
+                entry[name] = decoded[name][position]
+        entries.append(entry)
+    for position, rest in columns.get("extra", {}).items():
+        entries[int(position)].update(rest)
+    return entries
+
+
+# Fields stored in the uncompressed filter arrays rather than in the block.
+_FILTER_FIELDS = ("ts", "level", "category")
+
+# Marks a position whose entry lacks a filter field.
+_MISSING = object()
+
+
+def _in_filter_arrays(name: str, value: Any) -> bool:
+    # Values the filter arrays cannot hold (a null or non-integer ts, a
+    # non-string level) are kept in `extra` instead.
+    if name == "ts":
+        return _is_int(value)
+    if name in _FILTER_FIELDS:
+        return isinstance(value, str)
+    return False
+
+
+def _code_values(entries: list[dict[str, Any]], name: str) -> tuple[list[str], list[Optional[int]]]:
+    codes_by_value: dict[str, int] = {}
+    codes: list[Optional[int]] = []
+    for entry in entries:
+        value = entry.get(name)
+        if isinstance(value, str):
+            codes.append(codes_by_value.setdefault(value, len(codes_by_value)))
+        else:
+            codes.append(None)
+    return list(codes_by_value), codes
+
+
+def _decode_values(values: list[str], codes: list[Optional[int]]) -> list[Any]:
+    return [_MISSING if code is None else values[code] for code in codes]
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_int_or_none(value: Any) -> bool:
+    return value is None or _is_int(value)
+
+
+def _is_str_or_none(value: Any) -> bool:
+    return value is None or isinstance(value, str)
+
+
+def _delta_encode(values: list[Optional[int]]) -> list[Optional[int]]:
+    # Each value is stored as its difference from the previous non-null value,
+    # so sorted ids and timestamps shrink to small, repetitive numbers.
+    deltas = []
+    previous = 0
+    for value in values:
+        if value is None:
+            deltas.append(None)
+            continue
+        deltas.append(value - previous)
+        previous = value
+    return deltas
+
+
+def _delta_decode(deltas: list[Optional[int]]) -> list[Optional[int]]:
+    values = []
+    previous = 0
+    for delta in deltas:
+        if delta is None:
+            values.append(None)
+            continue
+        previous += delta
+        values.append(previous)
+    return values
+
+
+def _dictionary_encode(values: list[Any]) -> dict[str, list[Any]]:
+    codes_by_value: dict[Any, int] = {}
+    codes = [codes_by_value.setdefault(value, len(codes_by_value)) for value in values]
+    return {"values": list(codes_by_value), "codes": codes}
@@ -0,0 +1,96 @@
+from collections import Counter
+from typing import Any, Iterable
+
+
+# Bucket width in milliseconds for each rollup granularity.
+GRANULARITIES = {"minute": 60_000, "hour": 3_600_000}
+
+
+class RollupBuilder:
+    """
+    Accumulates the entry counts of one log file by minute, level, category
+    and template as its entries stream past during ingest, and turns them
+    into per-minute and per-hour rollup rows. Undated entries are skipped.
+    """
+    def __init__(self) -> None:
+        self._counts: Counter[tuple[int, str, str, Any]] = Counter()
+
+    def add(self, entries: Iterable[dict[str, Any]]) -> None:
+        self._counts.update(
+            (
+                entry["ts"] // GRANULARITIES["minute"],
+                str(entry.get("level")),
+                str(entry.get("category")),
+                entry.get("template_id"),
+            )
+            for entry in entries
+            if isinstance(entry.get("ts"), int)
+        )
+
+    def rows(self) -> list[dict[str, Any]]:
+        buckets: dict[tuple[str, int], dict[str, Any]] = {}
+        for (minute, level, category, template_id), count in self._counts.items():
+            for granularity, width in GRANULARITIES.items():
+                start = minute * GRANULARITIES["minute"] // width * width
+                bucket = buckets.get((granularity, start))
+                if bucket is None:
+                    bucket = buckets[(granularity, start)] = _empty_bucket(granularity, start)
+                bucket["count"] += count
+                bucket["levels"][level] += count
+                bucket["categories"][category] += count
+                if template_id is not None:
+                    bucket["templates"][str(template_id)] += count
+        return [_to_row(bucket) for _, bucket in sorted(buckets.items())]
+
+
+def merge_rollups(rows: Iterable[dict[str, Any]]) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """
+    Merges stored rollup rows (of several files) into one bucket per start
+    time, in time order, and returns the buckets with their overall totals.
+    """
+    buckets: dict[int, dict[str, Any]] = {}
+    totals = _empty_bucket("", 0)
+    for row in rows:
+        bucket = buckets.get(row["start"])
+        if bucket is None:
+            bucket = buckets[row["start"]] = _empty_bucket(row["granularity"], row["start"])
+        for target in (bucket, totals):
+            target["count"] += row["count"]
+            for name in ("levels", "categories", "templates"):
+                target[name].update(dict(row[name]))
+    return (
+        [_to_response(bucket) for _, bucket in sorted(buckets.items())],
+        {key: value for key, value in _to_response(totals).items() if key != "start"},
+    )
+
+
+def _empty_bucket(granularity: str, start: int) -> dict[str, Any]:
+    return {
+        "granularity": granularity,
+        "start": start,
+        "count": 0,
+        "levels": Counter(),
+        "categories": Counter(),
+        "templates": Counter(),
+    }
+
+
+def _to_row(bucket: dict[str, Any]) -> dict[str, Any]:
+    # Counts are stored as [key, count] pairs: category names are free text
+    # and cannot safely be used as document field names.
+    return {
+        **bucket,
+        "levels": sorted(bucket["levels"].items()),
+        "categories": sorted(bucket["categories"].items()),
+        "templates": sorted(bucket["templates"].items()),
+    }
+
+
+def _to_response(bucket: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "start": bucket["start"],
+        "count": bucket["count"],
+        "levels": dict(bucket["levels"]),
+        "categories": dict(bucket["categories"]),
+        "templates": dict(bucket["templates"]),
+    }
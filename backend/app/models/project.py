@@ -1,9 +1,19 @@
-from dataclasses import dataclass
-from datetime import datetime, timezone
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+import heapq
+import itertools
 import uuid
-from typing import Any, Optional
+from typing import Any, Iterable, Iterator, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 
 from app.database import get_db
+from app.models.log_chunks import ENCODING, decode_entries, encode_entries
+from app.models.log_rollups import GRANULARITIES, RollupBuilder
+from app.parsers.templates import merge_templates
 
 
 @dataclass
@@ -12,21 +22,37 @@ class Project:
     user_id: str
     name: str
     created_at: datetime
+    file_count: int = 0
+    entry_count: int = 0
+    alert_count: int = 0
+    last_ingest_at: Optional[datetime] = None
+    # False for projects created before the counters were kept.
+    has_counters: bool = True
 
 
 class ProjectRepository:
+    """
+    Projects carry denormalized counters (file_count, entry_count,
+    alert_count, last_ingest_at), updated as logs are ingested so listing
+    projects never has to count their files or alerts.
+    """
     def __init__(self) -> None:
         self._collection = get_db()["projects"]
-        self._ensure_indexes()
-
-    def _ensure_indexes(self) -> None:
-        self._collection.create_index([("user_id", 1), ("created_at", -1)])
 
     def create(self, user_id: str, name: str) -> Project:
         now = datetime.now(timezone.utc)
         project_id = str(uuid.uuid4())
         self._collection.insert_one(
-            {"_id": project_id, "user_id": user_id, "name": name, "created_at": now}
+            {
+                "_id": project_id,
+                "user_id": user_id,
+                "name": name,
+                "created_at": now,
+                "file_count": 0,
+                "entry_count": 0,
+                "alert_count": 0,
+                "last_ingest_at": None,
+            }
         )
         doc = self._collection.find_one({"_id": project_id})
         if doc is None:
@@ -43,15 +69,81 @@ class ProjectRepository:
             return None
         return self._to_project(doc)
 
+    def set_log_counters(
+        self, project_id: str, *, file_count: int, entry_count: int, ingested_at: datetime
+    ) -> None:
+        self._collection.update_one(
+            {"_id": project_id},
+            {
+                "$set": {
+                    "file_count": file_count,
+                    "entry_count": entry_count,
+                    "last_ingest_at": ingested_at,
+                }
+            },
+        )
+
+    def increment_alert_count(self, project_id: str, count: int) -> None:
+        if count:
+            self._collection.update_one({"_id": project_id}, {"$inc": {"alert_count": count}})
+
+    def start_template_ids(self, project_id: str, after: int) -> None:
+        """
+        Starts the project's template id counter after `after`, the highest
+        stored template id, unless it is already running.
+        """
+        self._collection.update_one(
+            {"_id": project_id, "template_seq": {"$exists": False}},
+            {"$set": {"template_seq": after}},
+        )
+
+    def reserve_template_ids(self, project_id: str, count: int) -> range:
+        """Allocates `count` template ids no other upload to the project gets."""
+        doc = self._collection.find_one_and_update(
+            {"_id": project_id},
+            {"$inc": {"template_seq": count}},
+            projection={"template_seq": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None:
+            raise TemplateIdAllocationError
+        return range(doc["template_seq"] - count + 1, doc["template_seq"] + 1)
+
+    def set_counters(self, counters: dict[str, dict[str, Any]]) -> None:
+        """Sets the counters of several projects at once, keyed by project id."""
+        if counters:
+            self._collection.bulk_write(
+                [
+                    UpdateOne({"_id": project_id}, {"$set": values})
+                    for project_id, values in counters.items()
+                ]
+            )
+
     def _to_project(self, doc: dict[str, Any]) -> Project:
         return Project(
             id=str(doc["_id"]),
             user_id=doc["user_id"],
             name=doc["name"],
             created_at=doc["created_at"],
+            file_count=doc.get("file_count", 0),
+            entry_count=doc.get("entry_count", 0),
+            alert_count=doc.get("alert_count", 0),
+            last_ingest_at=doc.get("last_ingest_at"),
+            has_counters="file_count" in doc,
         )
 
 
+# Entries are stored in chunk documents of at most this many entries.
+CHUNK_SIZE = 1000
+# Chunks with matches fetched per round trip by the logs page query.
+PAGE_CHUNK_BATCH = 16
+# An ingest refreshes its file's heartbeat after every batch; a file still
+# without rollups whose heartbeat is this old was left behind by a crash.
+STALE_INGEST_AFTER = timedelta(minutes=10)
+# Dated entries handed out per batch by iter_dated_batches.
+DATED_BATCH_SIZE = 50_000
+
+
 @dataclass
 class ProjectLogFile:
     id: str
@@ -60,21 +152,33 @@ class ProjectLogFile:
     filename: str
     created_at: datetime
     entries: list[dict[str, Any]]
+    entry_count: int = 0
+    min_ts: Optional[int] = None
+    max_ts: Optional[int] = None
+    level_counts: dict[str, int] = field(default_factory=dict)
 
 
 class ProjectLogRepository:
-    def __init__(self) -> None:
-        self._collection = get_db()["project_logs"]
-        self._ensure_indexes()
+    """
+    Log files are stored as one metadata document per file in project_logs
+    plus bucketed chunk documents in project_log_chunks, each holding up to
+    CHUNK_SIZE consecutive entries with their id range, min_ts/max_ts and
+    per-level counts. Reads of an id range or a time range only fetch the
+    chunks that overlap it, and files are not capped by the document size
+    limit.
 
-    def _ensure_indexes(self) -> None:
-        self._collection.create_index([("user_id", 1), ("project_id", 1)])
-        self._collection.create_index([("project_id", 1), ("created_at", -1)])
-        # Unique per file per project — re-uploading same filename replaces existing
-        self._collection.create_index(
-            [("user_id", 1), ("project_id", 1), ("filename", 1)],
-            unique=True,
-        )
+    Chunk entries are stored column-encoded and compressed (see log_chunks),
+    apart from the fields the logs page filters on, and are only decoded
+    back into entry dicts by the read methods here.
+
+    Ingest also writes per-minute and per-hour count rollups of each file to
+    project_log_rollups (see log_rollups), so stats never read the entries.
+    """
+    def __init__(self) -> None:
+        db = get_db()
+        self._collection = db["project_logs"]
+        self._chunks = db["project_log_chunks"]
+        self._rollups = db["project_log_rollups"]
 
     def add_file_logs(
         self,
@@ -84,55 +188,662 @@ class ProjectLogRepository:
         filename: str,
         entries: list[dict[str, Any]],
     ) -> ProjectLogFile:
+        return self.add_file_log_batches(
+            user_id=user_id, project_id=project_id, filename=filename, batches=[entries]
+        )
+
+    def add_file_log_batches(
+        self,
+        *,
+        user_id: str,
+        project_id: str,
+        filename: str,
+        batches: Iterable[list[dict[str, Any]]],
+    ) -> ProjectLogFile:
+        # Upsert: replace existing doc for same user+project+filename, or insert
+        # new. Entries are written chunk by chunk so the caller never has to
+        # hold a whole file's entries in memory.
         now = datetime.now(timezone.utc)
-        # Upsert: replace existing doc for same user+project+filename, or insert new
+        key = {"user_id": user_id, "project_id": project_id, "filename": filename}
         self._collection.replace_one(
-            {"user_id": user_id, "project_id": project_id, "filename": filename},
+            key,
             {
-                "user_id": user_id,
-                "project_id": project_id,
-                "filename": filename,
+                **key,
                 "created_at": now,
-                "entries": entries,
+                "entry_count": 0,
+                "level_counts": {},
+                "has_rollups": False,
+                "ingest_heartbeat_at": now,
             },
             upsert=True,
         )
-        doc = self._collection.find_one(
-            {"user_id": user_id, "project_id": project_id, "filename": filename}
+        doc = self._collection.find_one(key, {"_id": 1})
+        if doc is None:
+            raise ProjectLogCreationError
+        file_id = doc["_id"]
+        self._chunks.delete_many({"file_id": file_id})
+        self._rollups.delete_many({"file_id": file_id})
+
+        rollup = RollupBuilder()
+        entry_count = 0
+        level_counts: Counter[str] = Counter()
+        timestamps: list[int] = []
+        seq = 0
+        for batch in batches:
+            chunks = []
+            for offset in range(0, len(batch), CHUNK_SIZE):
+                chunk = chunk_document(
+                    user_id=user_id,
+                    project_id=project_id,
+                    file_id=file_id,
+                    seq=seq,
+                    entries=batch[offset:offset + CHUNK_SIZE],
+                )
+                chunks.append(chunk)
+                rollup.add(batch[offset:offset + CHUNK_SIZE])
+                seq += 1
+                entry_count += chunk["count"]
+                level_counts.update(chunk["level_counts"])
+                timestamps.extend(ts for ts in (chunk["min_ts"], chunk["max_ts"]) if ts is not None)
+            if chunks:
+                self._chunks.insert_many(chunks, ordered=False)
+                self._collection.update_one(
+                    {"_id": file_id},
+                    {"$set": {"ingest_heartbeat_at": datetime.now(timezone.utc)}},
+                )
+        self._store_rollups(
+            user_id=user_id,
+            project_id=project_id,
+            file_id=file_id,
+            rollup=rollup,
+            summary={
+                "entry_count": entry_count,
+                "min_ts": min(timestamps, default=None),
+                "max_ts": max(timestamps, default=None),
+                "level_counts": dict(level_counts),
+            },
         )
+        doc = self._collection.find_one({"_id": file_id}, {"entries": 0})
         if doc is None:
             raise ProjectLogCreationError
-        return self._to_project_log(doc)
+        return self._to_project_log(doc, [])
 
-    def count_files_for_project(self, *, user_id: str, project_id: str) -> int:
-        return self._collection.count_documents(
-            {"user_id": user_id, "project_id": project_id}
+    def find_entries(
+        self, *, user_id: str, project_id: str, file_id: str, ranges: list[list[int]]
+    ) -> list[dict[str, Any]]:
+        """Entries of one file whose ids fall in the inclusive [first, last] ranges."""
+        if not ranges:
+            return []
+        cursor = self._chunks.find(
+            {
+                "file_id": _object_id(file_id),
+                "user_id": user_id,
+                "project_id": project_id,
+                "$or": [
+                    {"first_id": {"$lte": last}, "last_id": {"$gte": first}}
+                    for first, last in ranges
+                ],
+            },
+            _ENTRY_FIELDS,
+        ).sort("seq", 1)
+        return [
+            entry
+            for chunk in cursor
+            for entry in decode_entries(chunk)
+            if any(first <= entry.get("id", 0) <= last for first, last in ranges)
+        ]
+
+    def find_entries_page(
+        self,
+        *,
+        user_id: str,
+        project_id: str,
+        limit: int,
+        after: Optional[tuple[str, int, int]] = None,
+        file_id: Optional[str] = None,
+        levels: Optional[list[str]] = None,
+        categories: Optional[list[str]] = None,
+        start_ts: Optional[int] = None,
+        end_ts: Optional[int] = None,
+        text: Optional[str] = None,
+    ) -> tuple[list[dict[str, Any]], Optional[tuple[str, int, int]]]:
+        """
+        Up to `limit` entries matching the filters, in file and entry id
+        order, each with its `file_id`, starting after the position `after`
+        (file_id, chunk seq, position in the chunk). Also returns the
+        position of the last entry when more entries match, else None.
+
+        Chunks are pruned on their summaries (time range, level counts,
+        category dictionary) in MongoDB, which then matches the level,
+        category and time filters entry by entry on the chunks' filter
+        arrays and returns only chunks with matches, with their positions.
+        Messages stay compressed, so a `text` filter (a case-insensitive
+        substring) is applied here to the decoded candidate chunks.
+        """
+        chunk_match: dict[str, Any] = {
+            "user_id": user_id,
+            "project_id": project_id,
+            "encoding": ENCODING,
+        }
+        chunk_filters: list[dict[str, Any]] = []
+        conditions: list[dict[str, Any]] = []
+        first_position: Any = 0
+        if file_id is not None:
+            chunk_match["file_id"] = _object_id(file_id)
+        if after is not None:
+            after_file, after_seq, after_position = _object_id(after[0]), after[1], after[2]
+            chunk_filters.append({"$or": [
+                {"file_id": {"$gt": after_file}},
+                {"file_id": after_file, "seq": {"$gte": after_seq}},
+            ]})
+            first_position = {"$cond": [
+                {"$and": [{"$eq": ["$file_id", after_file]}, {"$eq": ["$seq", after_seq]}]},
+                after_position + 1,
+                0,
+            ]}
+        if levels:
+            chunk_filters.append(
+                {"$or": [{f"level_counts.{level}": {"$gt": 0}} for level in levels]}
+            )
+            conditions.append({"$in": [_coded_value("levels", "level_codes"), levels]})
+        if categories:
+            chunk_match["categories"] = {"$in": categories}
+            conditions.append({"$in": [_coded_value("categories", "category_codes"), categories]})
+        if start_ts is not None or end_ts is not None:
+            ts = {"$add": ["$ts_base", {"$arrayElemAt": ["$ts_offsets", "$$position"]}]}
+            conditions.append({"$ne": [ts, None]})
+            if start_ts is not None:
+                chunk_match["max_ts"] = {"$gte": start_ts}
+                conditions.append({"$gte": [ts, start_ts]})
+            if end_ts is not None:
+                chunk_match["min_ts"] = {"$lte": end_ts}
+                conditions.append({"$lte": [ts, end_ts]})
+        if chunk_filters:
+            chunk_match["$and"] = chunk_filters
+
+        pipeline: list[dict[str, Any]] = [
+            {"$match": chunk_match},
+            {"$sort": {"file_id": 1, "seq": 1}},
+            {"$addFields": {"positions": {"$filter": {
+                "input": {"$range": [first_position, "$count"]},
+                "as": "position",
+                "cond": {"$and": conditions} if conditions else True,
+            }}}},
+            {"$match": {"positions.0": {"$exists": True}}},
+            {"$project": {**_ENTRY_FIELDS, "file_id": 1, "seq": 1, "positions": 1}},
+        ]
+        needle = text.lower() if text else None
+        page: list[dict[str, Any]] = []
+        last: Optional[tuple[str, int, int]] = None
+        cursor = self._chunks.aggregate(pipeline, batchSize=PAGE_CHUNK_BATCH)
+        try:
+            for chunk in cursor:
+                entries = decode_entries(chunk)
+                for position in chunk["positions"]:
+                    entry = entries[position]
+                    if needle is not None and needle not in str(entry.get("message", "")).lower():
+                        continue
+                    if len(page) == limit:
+                        return page, last
+                    page.append({**entry, "file_id": str(chunk["file_id"])})
+                    last = (str(chunk["file_id"]), chunk["seq"], position)
+        finally:
+            cursor.close()
+        return page, None
+
+    def find_rollups(
+        self,
+        *,
+        user_id: str,
+        project_id: str,
+        granularity: str,
+        start_ts: Optional[int] = None,
+        end_ts: Optional[int] = None,
+        file_id: Optional[str] = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Rollup rows of one granularity whose buckets overlap [start_ts,
+        end_ts], one per file and bucket, ordered by bucket start.
+        """
+        self._backfill_rollups(user_id=user_id, project_id=project_id)
+        query: dict[str, Any] = {
+            "user_id": user_id,
+            "project_id": project_id,
+            "granularity": granularity,
+        }
+        if file_id is not None:
+            query["file_id"] = _object_id(file_id)
+        if start_ts is not None:
+            width = GRANULARITIES[granularity]
+            query.setdefault("start", {})["$gte"] = start_ts // width * width
+        if end_ts is not None:
+            query.setdefault("start", {})["$lte"] = end_ts
+        cursor = self._rollups.find(query, {"_id": 0, "file_id": 0}).sort("start", 1)
+        return list(cursor)
+
+    def summarize_projects(
+        self, *, user_id: str, project_ids: list[str]
+    ) -> dict[str, dict[str, Any]]:
+        """
+        File and entry counts and the latest upload time of each project, in
+        one aggregation over the file metadata. Projects without files are
+        left out.
+        """
+        cursor = self._collection.aggregate(
+            [
+                {"$match": {"user_id": user_id, "project_id": {"$in": project_ids}}},
+                {
+                    "$group": {
+                        "_id": "$project_id",
+                        "file_count": {"$sum": 1},
+                        # Files stored before chunking have no entry_count.
+                        "entry_count": {
+                            "$sum": {
+                                "$ifNull": [
+                                    "$entry_count",
+                                    {"$size": {"$ifNull": ["$entries", []]}},
+                                ]
+                            }
+                        },
+                        "last_ingest_at": {"$max": "$created_at"},
+                    }
+                },
+            ]
+        )
+        return {
+            doc["_id"]: {
+                "file_count": doc["file_count"],
+                "entry_count": doc["entry_count"],
+                "last_ingest_at": doc["last_ingest_at"],
+            }
+            for doc in cursor
+        }
+
+    def find_existing_filenames(
+        self, *, user_id: str, project_id: str, filenames: Iterable[str]
+    ) -> set[str]:
+        """Those of the given filenames a project already has a file for."""
+        cursor = self._collection.find(
+            {"user_id": user_id, "project_id": project_id, "filename": {"$in": list(filenames)}},
+            {"filename": 1},
         )
+        return {doc["filename"] for doc in cursor}
 
-    def list_files_for_project(
+    def iter_files_for_project(
         self, *, user_id: str, project_id: str
-    ) -> list[ProjectLogFile]:
+    ) -> Iterator[ProjectLogFile]:
+        """A project's files, newest first, without their entries; see iter_entries."""
         cursor = (
             self._collection.find({"user_id": user_id, "project_id": project_id})
             .sort("created_at", -1)
         )
-        return [self._to_project_log(doc) for doc in cursor]
+        for doc in cursor:
+            yield self._to_project_log(doc, [])
 
-    def _to_project_log(self, doc: dict[str, Any]) -> ProjectLogFile:
+    def iter_entries(self, file: ProjectLogFile) -> Iterator[dict[str, Any]]:
+        """A file's entries in id order, read chunk by chunk from a cursor."""
+        if file.entries:
+            yield from file.entries
+            return
+        cursor = self._chunks.find(
+            {"file_id": _object_id(file.id)}, {**_ENTRY_FIELDS, "_id": 0}
+        ).sort("seq", 1)
+        for chunk in cursor:
+            yield from decode_entries(chunk)
+
+    def iter_dated_batches(
+        self,
+        *,
+        user_id: str,
+        project_id: str,
+        file_ids: Optional[list[str]] = None,
+        batch_size: int = DATED_BATCH_SIZE,
+    ) -> Iterator[list[dict[str, Any]]]:
+        """
+        The dated entries of a project's files (only `file_ids` when given),
+        tagged with their file_id, in `ts` order and in batches of about
+        `batch_size`. Chunks are read in min_ts order, and an entry is handed
+        out once no unread chunk can hold an earlier one, so only the chunks
+        that overlap in time are held in memory, never whole files.
+        """
+        file_query: dict[str, Any] = {"user_id": user_id, "project_id": project_id}
+        chunk_query: dict[str, Any] = {**file_query, "min_ts": {"$ne": None}}
+        if file_ids is not None:
+            object_ids = [_object_id(file_id) for file_id in file_ids]
+            file_query["_id"] = {"$in": object_ids}
+            chunk_query["file_id"] = {"$in": object_ids}
+
+        # (ts, arrival order, entry): equal timestamps keep their read order.
+        pending: list[tuple[int, int, dict[str, Any]]] = []
+        arrival = itertools.count()
+
+        def push(entries: Iterable[dict[str, Any]], file_id: str) -> None:
+            for entry in entries:
+                if entry.get("ts") is not None:
+                    entry["file_id"] = file_id
+                    heapq.heappush(pending, (entry["ts"], next(arrival), entry))
+
+        # Files stored before chunking still carry their entries inline.
+        for doc in self._collection.find(
+            {**file_query, "entries.0": {"$exists": True}}, {"entries": 1}
+        ):
+            push(doc["entries"], str(doc["_id"]))
+
+        batch: list[dict[str, Any]] = []
+        cursor = self._chunks.find(
+            chunk_query, {**_ENTRY_FIELDS, "file_id": 1, "min_ts": 1}
+        ).sort([("min_ts", 1), ("file_id", 1), ("seq", 1)])
+        for chunk in cursor:
+            while pending and pending[0][0] < chunk["min_ts"]:
+                batch.append(heapq.heappop(pending)[2])
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            push(decode_entries(chunk), str(chunk["file_id"]))
+        while pending:
+            batch.append(heapq.heappop(pending)[2])
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _store_rollups(
+        self,
+        *,
+        user_id: str,
+        project_id: str,
+        file_id: Any,
+        rollup: RollupBuilder,
+        summary: dict[str, Any],
+    ) -> None:
+        # The file's counters and has_rollups are set together, last, so a
+        # file marked complete always has both.
+        rows = rollup.rows()
+        self._rollups.delete_many({"file_id": file_id})
+        if rows:
+            self._rollups.insert_many(
+                [
+                    {"user_id": user_id, "project_id": project_id, "file_id": file_id, **row}
+                    for row in rows
+                ]
+            )
+        self._collection.update_one(
+            {"_id": file_id},
+            {"$set": {**summary, "has_rollups": True}, "$unset": {"ingest_heartbeat_at": ""}},
+        )
+
+    def _backfill_rollups(self, *, user_id: str, project_id: str) -> None:
+        # Files stored before rollups existed get theirs on first read, and so
+        # do files whose ingest stopped without storing them. Each is claimed
+        # by refreshing its heartbeat first, so concurrent reads and live
+        # ingests leave it alone.
+        now = datetime.now(timezone.utc)
+        live = {"$gte": now - STALE_INGEST_AFTER}
+        pending = {"$or": [
+            {"has_rollups": {"$exists": False}},
+            {"has_rollups": False, "ingest_heartbeat_at": {"$not": live}},
+        ]}
+        cursor = self._collection.find(
+            {"user_id": user_id, "project_id": project_id, **pending}, {"_id": 1}
+        )
+        for file_id in [doc["_id"] for doc in cursor]:
+            doc = self._collection.find_one_and_update(
+                {"_id": file_id, **pending},
+                {"$set": {"has_rollups": False, "ingest_heartbeat_at": now}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if doc is None:
+                continue
+            # Rebuilt from what was stored, which for a crashed ingest is the
+            # chunks written before the crash.
+            rollup = RollupBuilder()
+            entry_count = 0
+            level_counts: Counter[str] = Counter()
+            min_ts: Optional[int] = None
+            max_ts: Optional[int] = None
+            for entry in self.iter_entries(self._to_project_log(doc, [])):
+                rollup.add((entry,))
+                entry_count += 1
+                level_counts[str(entry.get("level"))] += 1
+                ts = entry.get("ts")
+                if ts is not None:
+                    min_ts = ts if min_ts is None else min(min_ts, ts)
+                    max_ts = ts if max_ts is None else max(max_ts, ts)
+            self._store_rollups(
+                user_id=user_id,
+                project_id=project_id,
+                file_id=file_id,
+                rollup=rollup,
+                summary={
+                    "entry_count": entry_count,
+                    "min_ts": min_ts,
+                    "max_ts": max_ts,
+                    "level_counts": dict(level_counts),
+                },
+            )
+
+    def _to_project_log(
+        self, doc: dict[str, Any], entries: list[dict[str, Any]]
+    ) -> ProjectLogFile:
         return ProjectLogFile(
             id=str(doc["_id"]),
             project_id=str(doc["project_id"]),
             user_id=doc["user_id"],
             filename=doc["filename"],
             created_at=doc["created_at"],
-            entries=list(doc.get("entries") or []),
+            # Files stored before chunking still carry their entries inline.
+            entries=doc.get("entries") or entries,
+            entry_count=doc.get("entry_count", len(doc.get("entries") or entries)),
+            min_ts=doc.get("min_ts"),
+            max_ts=doc.get("max_ts"),
+            level_counts=dict(doc.get("level_counts") or {}),
         )
 
 
+def chunk_document(
+    *, user_id: str, project_id: str, file_id: Any, seq: int, entries: list[dict[str, Any]]
+) -> dict[str, Any]:
+    timestamps = [entry["ts"] for entry in entries if entry.get("ts") is not None]
+    ids = [entry["id"] for entry in entries if entry.get("id") is not None]
+    return {
+        "user_id": user_id,
+        "project_id": project_id,
+        "file_id": file_id,
+        "seq": seq,
+        "first_id": min(ids, default=None),
+        "last_id": max(ids, default=None),
+        "min_ts": min(timestamps, default=None),
+        "max_ts": max(timestamps, default=None),
+        "count": len(entries),
+        "level_counts": dict(Counter(str(entry.get("level")) for entry in entries)),
+        **encode_entries(entries),
+    }
+
+
+# Chunk fields decode_entries reads, for both columnar and row chunks.
+_ENTRY_FIELDS = {
+    "encoding": 1,
+    "codec": 1,
+    "columns": 1,
+    "ts_base": 1,
+    "ts_offsets": 1,
+    "levels": 1,
+    "level_codes": 1,
+    "categories": 1,
+    "category_codes": 1,
+    "index": 1,
+    "entries": 1,
+}
+
+
+def _coded_value(values: str, codes: str) -> dict[str, Any]:
+    # The value of the entry at $$position in a chunk's filter array: its
+    # code looked up in the chunk's dictionary; null when it has none.
+    return {"$arrayElemAt": [f"${values}", {"$arrayElemAt": [f"${codes}", "$$position"]}]}
+
+
+class ProjectLogTemplateRepository:
+    def __init__(self) -> None:
+        self._collection = get_db()["project_log_templates"]
+
+    def list_for_project(self, *, user_id: str, project_id: str) -> list[dict[str, Any]]:
+        cursor = self._collection.find(
+            {"user_id": user_id, "project_id": project_id},
+            {"_id": 0, "template_id": 1, "template": 1, "count": 1},
+        ).sort("template_id", 1)
+        return list(cursor)
+
+    def merge_for_project(
+        self, *, user_id: str, project_id: str, changes: list[dict[str, Any]]
+    ) -> None:
+        """
+        Merges a miner's changes (see TemplateMiner.changes) into the stored
+        templates: counts are incremented and texts combined with whatever
+        concurrent uploads stored meanwhile, never overwritten.
+        """
+        if not changes:
+            return
+        key = {"user_id": user_id, "project_id": project_id}
+        stored = {
+            doc["template_id"]: doc["template"]
+            for doc in self._collection.find(
+                {**key, "template_id": {"$in": [change["template_id"] for change in changes]}},
+                {"_id": 0, "template_id": 1, "template": 1},
+            )
+        }
+        unchanged = []
+        for change in changes:
+            template_key = {**key, "template_id": change["template_id"]}
+            template = stored.get(change["template_id"])
+            if template is None:
+                unchanged.append(_insert_template(template_key, change))
+            elif merge_templates(template, change["template"]) == template:
+                unchanged.append(UpdateOne(template_key, {"$inc": {"count": change["added"]}}))
+            else:
+                self._merge_text(template_key, template, change)
+        if unchanged:
+            self._collection.bulk_write(unchanged, ordered=False)
+
+    def _merge_text(
+        self, template_key: dict[str, Any], template: str, change: dict[str, Any]
+    ) -> None:
+        # Compare-and-set on the text, re-read and retried when another
+        # upload changed it first.
+        while True:
+            result = self._collection.update_one(
+                {**template_key, "template": template},
+                {
+                    "$set": {"template": merge_templates(template, change["template"])},
+                    "$inc": {"count": change["added"]},
+                },
+            )
+            if result.matched_count:
+                return
+            doc = self._collection.find_one(template_key, {"template": 1})
+            if doc is None:
+                self._collection.bulk_write([_insert_template(template_key, change)])
+                return
+            template = doc["template"]
+
+
+def _insert_template(template_key: dict[str, Any], change: dict[str, Any]) -> UpdateOne:
+    return UpdateOne(
+        template_key,
+        {"$setOnInsert": {"template": change["template"]}, "$inc": {"count": change["added"]}},
+        upsert=True,
+    )
+
+
+class ProjectAlertStateRepository:
+    """
+    Per-project alert engine state: each rule's open window, so logs added
+    later are evaluated without re-reading the project's older logs.
+    """
+    def __init__(self) -> None:
+        self._collection = get_db()["project_alert_state"]
+
+    def get_for_project(
+        self, *, user_id: str, project_id: str
+    ) -> tuple[dict[str, dict[str, Any]], int]:
+        """The project's state and its version (0 when none was saved yet)."""
+        doc = self._collection.find_one({"user_id": user_id, "project_id": project_id})
+        if doc is None:
+            return {}, 0
+        # Rule keys can contain dots, so they are stored as values, not field names.
+        return {rule["key"]: rule["state"] for rule in doc.get("rules", [])}, doc.get("version", 1)
+
+    def save_for_project(
+        self,
+        *,
+        user_id: str,
+        project_id: str,
+        state: dict[str, dict[str, Any]],
+        version: int,
+    ) -> bool:
+        """
+        Saves the state computed from the one read at `version`. Returns False,
+        saving nothing, when another ingest saved a newer state meanwhile.
+        """
+        key = {"user_id": user_id, "project_id": project_id}
+        fields = {
+            "updated_at": datetime.now(timezone.utc),
+            "rules": [{"key": rule_key, "state": value} for rule_key, value in state.items()],
+            "version": version + 1,
+        }
+        if version == 0:
+            try:
+                self._collection.insert_one({**key, **fields})
+            except DuplicateKeyError:
+                return False
+            return True
+        # States saved before versioning count as version 1.
+        version_match = {"$in": [version, None]} if version == 1 else version
+        result = self._collection.update_one({**key, "version": version_match}, {"$set": fields})
+        return result.matched_count == 1
+
+
+class ProjectRuleSetRepository:
+    """
+    Per-project alert rule sets. Every save bumps the version, which keys the
+    compiled plan cache.
+    """
+    def __init__(self) -> None:
+        self._collection = get_db()["project_rule_sets"]
+
+    def get_for_project(self, *, user_id: str, project_id: str) -> Optional[dict[str, Any]]:
+        return self._collection.find_one(
+            {"user_id": user_id, "project_id": project_id},
+            {"_id": 0, "version": 1, "rules": 1, "updated_at": 1},
+        )
+
+    def save_for_project(
+        self, *, user_id: str, project_id: str, rules: list[dict[str, Any]]
+    ) -> dict[str, Any]:
+        return self._collection.find_one_and_update(
+            {"user_id": user_id, "project_id": project_id},
+            {
+                "$set": {"rules": rules, "updated_at": datetime.now(timezone.utc)},
+                "$inc": {"version": 1},
+            },
+            projection={"_id": 0, "version": 1, "rules": 1, "updated_at": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+
+def _object_id(value: str) -> Any:
+    return ObjectId(value) if ObjectId.is_valid(value) else value
+
+
 class ProjectCreationError(Exception):
     pass
 
 
+class TemplateIdAllocationError(Exception):
+    pass
+
+
 class ProjectLogCreationError(Exception):
     pass
 
@@ -18,10 +18,6 @@ class User:
 class UserRepository:
     def __init__(self) -> None:
         self._collection = get_db()["users"]
-        self._ensure_indexes()
-
-    def _ensure_indexes(self) -> None:
-        self._collection.create_index("username", unique=True)
 
     def find_by_username(self, username: str) -> Optional[User]:
         doc = self._collection.find_one({"username": username})
@@ -0,0 +1,47 @@
+import bz2
+import gzip
+import lzma
+import re
+from typing import BinaryIO, Callable
+
+try:
+    import zstandard
+except ImportError:  # .zst uploads are rejected when zstandard is not installed
+    zstandard = None
+
+
+# app.log, app.log.1, app.log.1.gz, app.log.xz, ...
+_LOG_NAME_RE = re.compile(r"\.log(?:\.\d+)?(?:\.(gz|bz2|xz|zst))?$", re.IGNORECASE)
+
+_DECOMPRESSORS: dict[str, Callable[[BinaryIO], BinaryIO]] = {
+    "gz": lambda stream: gzip.GzipFile(fileobj=stream, mode="rb"),
+    "bz2": lambda stream: bz2.BZ2File(stream, mode="rb"),
+    "xz": lambda stream: lzma.LZMAFile(stream, mode="rb"),
+}
+if zstandard is not None:
+    _DECOMPRESSORS["zst"] = lambda stream: zstandard.ZstdDecompressor().stream_reader(stream)
+
+# Errors a decompressor raises on a truncated or corrupt archive.
+DECOMPRESSION_ERRORS: tuple[type[BaseException], ...] = (OSError, EOFError, lzma.LZMAError)
+if zstandard is not None:
+    DECOMPRESSION_ERRORS += (zstandard.ZstdError,)
+
+
+def is_log_filename(filename: str) -> bool:
+    match = _LOG_NAME_RE.search(filename)
+    if match is None:
+        return False
+    suffix = match.group(1)
+    return suffix is None or suffix.lower() in _DECOMPRESSORS
+
+
+def open_log_stream(stream: BinaryIO, filename: str) -> BinaryIO:
+    """
+    Returns a stream of the uncompressed log bytes, decompressing on the fly
+    when `filename` names a compressed archive.
+    """
+    match = _LOG_NAME_RE.search(filename)
+    suffix = match.group(1) if match else None
+    if suffix is None:
+        return stream
+    return _DECOMPRESSORS[suffix.lower()](stream)
@@ -0,0 +1,345 @@
+import json
+import math
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+
+@dataclass(frozen=True)
+class LogFormat:
+    """
+    A dedicated parser for one log layout. `parse` returns the entry dict for
+    a line, or None when the line is not in this layout.
+    """
+    name: str
+    parse: Callable[[str, int], Optional[dict]]
+
+
+_FORMATS: dict[str, LogFormat] = {}
+
+DEFAULT_FORMAT = "spring"
+SNIFF_LINE_COUNT = 50
+# Share of sniffed lines a format must parse exactly before it is chosen.
+SNIFF_MIN_RATIO = 0.5
+
+_LEVEL_ALIASES = {
+    "TRACE": "DEBUG",
+    "DEBUG": "DEBUG",
+    "INFO": "INFO",
+    "NOTICE": "INFO",
+    "WARN": "WARN",
+    "WARNING": "WARN",
+    "ERROR": "ERROR",
+    "ERR": "ERROR",
+    "SEVERE": "ERROR",
+    "FATAL": "ERROR",
+    "CRITICAL": "ERROR",
+    "CRIT": "ERROR",
+    "ALERT": "ERROR",
+    "EMERG": "ERROR",
+}
+
+# Syslog severities 0-7 (emerg .. debug).
+_SYSLOG_LEVELS = ("ERROR", "ERROR", "ERROR", "ERROR", "WARN", "INFO", "INFO", "DEBUG")
+
+_MONTHS = {
+    "Jan": "01", "Feb": "02", "Mar": "03", "Apr": "04", "May": "05", "Jun": "06",
+    "Jul": "07", "Aug": "08", "Sep": "09", "Oct": "10", "Nov": "11", "Dec": "12",
+}
+
+
+def register_format(log_format: LogFormat) -> None:
+    _FORMATS[log_format.name] = log_format
+
+
+def get_format(name: str) -> LogFormat:
+    return _FORMATS[name]
+
+
+def available_formats() -> list[str]:
+    return list(_FORMATS)
+
+
+def sniff_format(lines: list[str]) -> LogFormat:
+    """
+    Picks the registered format that parses the most of `lines` exactly,
+    falling back to the default layout when none parses enough of them.
+    """
+    sample = [line for line in lines if line.strip()][:SNIFF_LINE_COUNT]
+    best: Optional[LogFormat] = None
+    best_hits = 0
+    for log_format in _FORMATS.values():
+        hits = sum(1 for index, line in enumerate(sample) if log_format.parse(line, index))
+        if hits > best_hits:
+            best, best_hits = log_format, hits
+    if best is None or best_hits < len(sample) * SNIFF_MIN_RATIO:
+        return _FORMATS[DEFAULT_FORMAT]
+    return best
+
+
+def to_epoch_ms(
+    date: str,
+    time: str,
+    seconds: Optional[str] = None,
+    fraction: Optional[str] = None,
+    offset: Optional[str] = None,
+) -> Optional[int]:
+    """
+    Converts a `YYYY-MM-DD` date and `HH:MM` time, plus optional seconds,
+    fractional seconds and UTC offset, into epoch milliseconds. Timestamps
+    without an offset are taken as UTC. Returns None for impossible values.
+    """
+    try:
+        year, month, day = int(date[0:4]), int(date[5:7]), int(date[8:10])
+        hour, minute = int(time[0:2]), int(time[3:5])
+        second = int(seconds) if seconds else 0
+    except ValueError:
+        return None
+    if not (1 <= month <= 12 and 1 <= day <= 31 and hour < 24 and minute < 60 and second <= 60):
+        return None
+    millis = int((fraction + "00")[:3]) if fraction else 0
+    # Days since 1970-01-01 in the proleptic Gregorian calendar, computed
+    # arithmetically so ingest allocates no datetime per line.
+    y = year - (month <= 2)
+    era = y // 400
+    year_of_era = y - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    days = era * 146097 + day_of_era - 719468
+    minutes = (days * 24 + hour) * 60 + minute - _offset_minutes(offset)
+    return (minutes * 60 + second) * 1000 + millis
+
+
+def _offset_minutes(offset: Optional[str]) -> int:
+    if not offset or offset == "Z":
+        return 0
+    digits = offset[1:].replace(":", "")
+    minutes = int(digits[0:2]) * 60 + (int(digits[2:4]) if len(digits) >= 4 else 0)
+    return -minutes if offset[0] == "-" else minutes
+
+
+def _entry(
+    index: int,
+    date: str,
+    time: str,
+    level: str,
+    category: str,
+    message: str,
+    ts: Optional[int],
+) -> dict:
+    return {
+        "id": index + 1,
+        "date": date,
+        "time": time,
+        "ts": ts,
+        "level": level,
+        "category": category or "General",
+        "message": message,
+    }
+
+
+def _normalize_level(raw: object) -> str:
+    return _LEVEL_ALIASES.get(str(raw).upper(), "INFO")
+
+
+def _short_category(name: str) -> str:
+    return name.rsplit(".", 1)[-1]
+
+
+# Spring Boot console layout, e.g.
+#   2026-02-19 19:08:12.345  INFO 1234 --- [main] c.e.demo.UserService : Started
+# matched in a single anchored pass. The grammar is kept narrow enough that any
+# line it accepts gets exactly the fields the per-field heuristics in
+# log_parser would give; everything else falls through to them.
+_SPRING_LINE_RE = re.compile(
+    r"(\d{4}-\d{2}-\d{2}) (\d{2}:\d{2})(?::(\d{2})(?:[.,](\d+))?)?"
+    r"\s+(INFO|WARN|ERROR|DEBUG)\s+\d+\s+---\s+"
+    r"(?:\[[^\]:]*\]\s+)*\[[^\]:]*\]\s+"
+    r"([a-zA-Z0-9.]+) +: (.*)",
+    re.DOTALL,
+)
+
+
+def _parse_spring(line: str, index: int) -> Optional[dict]:
+    match = _SPRING_LINE_RE.match(line)
+    if match is None:
+        return None
+    date, time, seconds, fraction, level, category, message = match.groups()
+    ts = to_epoch_ms(date, time, seconds, fraction)
+    return _entry(index, date, time, level, _short_category(category), message, ts)
+
+
+# Default logback PatternLayout:
+#   2026-02-19 19:08:12.345 [main] INFO  c.e.demo.UserService - Started
+_LOGBACK_LINE_RE = re.compile(
+    r"(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2})(?::(\d{2})(?:[.,](\d+))?)? "
+    r"\[[^\]]*\] (TRACE|DEBUG|INFO|WARN|ERROR|FATAL)\s+(\S+) - (.*)",
+    re.DOTALL,
+)
+
+
+def _parse_logback(line: str, index: int) -> Optional[dict]:
+    match = _LOGBACK_LINE_RE.match(line)
+    if match is None:
+        return None
+    date, time, seconds, fraction, level, category, message = match.groups()
+    ts = to_epoch_ms(date, time, seconds, fraction)
+    return _entry(
+        index, date, time, _LEVEL_ALIASES[level], _short_category(category), message, ts
+    )
+
+
+ISO_TIMESTAMP_RE = re.compile(
+    r"(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2})(?::(\d{2})(?:[.,](\d+))?)?"
+    r"(Z|[+-]\d{2}(?::?\d{2})?)?"
+)
+_JSON_TIME_KEYS = ("timestamp", "@timestamp", "time", "ts", "datetime")
+_JSON_LEVEL_KEYS = ("level", "severity", "log.level", "levelname", "lvl")
+_JSON_CATEGORY_KEYS = ("logger", "logger_name", "category", "name", "service")
+_JSON_MESSAGE_KEYS = ("message", "msg", "@message", "log")
+
+
+def _first_key(record: dict, keys: tuple[str, ...]) -> object:
+    for key in keys:
+        value = record.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+# Epoch milliseconds of 0001-01-01 and 9999-12-31T23:59:59.999, the range
+# datetime can represent.
+_MIN_EPOCH_MS = -62_135_596_800_000
+_MAX_EPOCH_MS = 253_402_300_799_999
+
+
+def _epoch_number_to_ms(value: float) -> Optional[int]:
+    """
+    Epoch milliseconds from a numeric timestamp in seconds, milliseconds,
+    microseconds or nanoseconds, told apart by magnitude. Returns None for
+    NaN, infinities and values outside the range of dates.
+    """
+    if not math.isfinite(value):
+        return None
+    magnitude = abs(value)
+    if magnitude < 1e11:
+        ms = value * 1000
+    elif magnitude < 1e14:
+        ms = value
+    elif magnitude < 1e17:
+        ms = value / 1000
+    else:
+        ms = value / 1_000_000
+    ms = int(ms)
+    if not _MIN_EPOCH_MS <= ms <= _MAX_EPOCH_MS:
+        return None
+    return ms
+
+
+def _parse_json_line(line: str, index: int) -> Optional[dict]:
+    if not line.startswith("{"):
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict):
+        return None
+    date, time, ts = "", "00:00", None
+    stamp = _first_key(record, _JSON_TIME_KEYS)
+    if isinstance(stamp, (int, float)) and not isinstance(stamp, bool):
+        ts = _epoch_number_to_ms(stamp)
+        if ts is not None:
+            moment = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
+            date, time = moment.strftime("%Y-%m-%d"), moment.strftime("%H:%M")
+    elif isinstance(stamp, str):
+        match = ISO_TIMESTAMP_RE.search(stamp)
+        if match:
+            date, time = match.group(1, 2)
+            ts = to_epoch_ms(*match.groups())
+    level = _first_key(record, _JSON_LEVEL_KEYS)
+    category = _first_key(record, _JSON_CATEGORY_KEYS)
+    message = _first_key(record, _JSON_MESSAGE_KEYS)
+    return _entry(
+        index,
+        date,
+        time,
+        _normalize_level(level) if level is not None else "INFO",
+        _short_category(str(category)) if category is not None else "General",
+        str(message) if message is not None else line,
+        ts,
+    )
+
+
+# RFC 5424: <PRI>VERSION TIMESTAMP HOST APP PROCID MSGID SD MSG
+_SYSLOG_5424_RE = re.compile(
+    r"<(\d{1,3})>\d{1,2} (\d{4}-\d{2}-\d{2})T(\d{2}:\d{2}):(\d{2})(?:\.(\d+))?"
+    r"(Z|[+-]\d{2}:\d{2}) \S+ (\S+) \S+ \S+ "
+    r"(?:-|(?:\[.*?\])+) ?(.*)",
+    re.DOTALL,
+)
+# RFC 3164: <PRI>Mmm dd hh:mm:ss HOST TAG[PID]: MSG (the PRI is often stripped
+# by the time the line reaches a file).
+_SYSLOG_3164_RE = re.compile(
+    r"(?:<(\d{1,3})>)?([A-Z][a-z]{2}) ([ \d]\d) (\d{2}:\d{2}):(\d{2}) \S+ "
+    r"([^\s:\[]+)(?:\[\d+\])?: (.*)",
+    re.DOTALL,
+)
+_MESSAGE_LEVEL_RE = re.compile(r"\b(DEBUG|INFO|WARN|WARNING|ERROR|FATAL|CRITICAL)\b")
+
+
+def _syslog_level(priority: Optional[str], message: str) -> str:
+    if priority is not None:
+        return _SYSLOG_LEVELS[int(priority) % 8]
+    match = _MESSAGE_LEVEL_RE.search(message)
+    return _LEVEL_ALIASES[match.group(1)] if match else "INFO"
+
+
+def _parse_syslog(line: str, index: int) -> Optional[dict]:
+    match = _SYSLOG_5424_RE.match(line)
+    if match is not None:
+        priority, date, time, seconds, fraction, offset, app, message = match.groups()
+        ts = to_epoch_ms(date, time, seconds, fraction, offset)
+        return _entry(index, date, time, _syslog_level(priority, message), app, message, ts)
+    match = _SYSLOG_3164_RE.match(line)
+    if match is None:
+        return None
+    priority, month, day, time, seconds, tag, message = match.groups()
+    if month not in _MONTHS:
+        return None
+    # RFC 3164 timestamps carry no year; assume the current one.
+    year = datetime.now(timezone.utc).year
+    date = f"{year}-{_MONTHS[month]}-{int(day):02d}"
+    ts = to_epoch_ms(date, time, seconds)
+    return _entry(index, date, time, _syslog_level(priority, message), tag, message, ts)
+
+
+# nginx/Apache common and combined log formats:
+#   1.2.3.4 - - [19/Feb/2026:19:08:12 +0000] "GET /x HTTP/1.1" 404 153 "-" "curl/8.0"
+_ACCESS_LINE_RE = re.compile(
+    r"\S+ \S+ \S+ \[(\d{2})/([A-Z][a-z]{2})/(\d{4}):(\d{2}:\d{2}):(\d{2})(?: ([+-]\d{4}))?\] "
+    r"\"([^\"]*)\" (\d{3}) (\d+|-)",
+)
+
+
+def _parse_access(line: str, index: int) -> Optional[dict]:
+    match = _ACCESS_LINE_RE.match(line)
+    if match is None:
+        return None
+    day, month, year, time, seconds, offset, request, status, size = match.groups()
+    if month not in _MONTHS:
+        return None
+    level = "ERROR" if status[0] == "5" else "WARN" if status[0] == "4" else "INFO"
+    message = f"{request} status={status} bytes={size}"
+    date = f"{year}-{_MONTHS[month]}-{day}"
+    ts = to_epoch_ms(date, time, seconds, None, offset)
+    return _entry(index, date, time, level, "Access", message, ts)
+
+
+# Registration order breaks sniffing ties, so stricter layouts come first.
+register_format(LogFormat("jsonl", _parse_json_line))
+register_format(LogFormat("syslog", _parse_syslog))
+register_format(LogFormat("access", _parse_access))
+register_format(LogFormat("logback", _parse_logback))
+register_format(LogFormat(DEFAULT_FORMAT, _parse_spring))
@@ -1,4 +1,15 @@
+import codecs
 import re
+from itertools import chain, islice
+from typing import Any, BinaryIO, Iterable, Iterator, Optional
+
+from app.parsers.formats import (
+    ISO_TIMESTAMP_RE,
+    SNIFF_LINE_COUNT,
+    LogFormat,
+    sniff_format,
+    to_epoch_ms,
+)
 
 
 _DATE_RE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
@@ -6,16 +17,116 @@ _TIME_RE = re.compile(r"\b\d{2}:\d{2}\b")
 _LEVEL_RE = re.compile(r"\b(INFO|WARN|ERROR|DEBUG)\b")
 _CATEGORY_RE = re.compile(r"\]\s+([a-zA-Z0-9.]+)\s+:")
 
+# Every boundary str.splitlines() breaks on, used to tell whether a decoded
+# chunk ended mid-line.
+_LINE_BREAKS = ("\n", "\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+
+READ_CHUNK_BYTES = 64 * 1024
+ENTRY_BATCH_SIZE = 1000
+# Continuation lines kept per entry. Past this, lines are only counted in
+# `stack_omitted`, so one dated line followed by a long undated tail cannot
+# grow an entry without bound (or past the 16 MB document limit).
+MAX_STACK_LINES = 500
+
 
 def parse_log_text(text: str) -> list[dict]:
-    lines = [line for line in text.splitlines() if line.strip()]
-    parsed: list[dict] = []
-    for index, line in enumerate(lines):
-        parsed.append(_parse_line(line, index))
-    return parsed
+    return list(iter_log_entries(text.splitlines()))
+
+
+def iter_log_lines(stream: BinaryIO, chunk_size: int = READ_CHUNK_BYTES) -> Iterator[str]:
+    """
+    Yields decoded lines from a binary stream, reading it in fixed-size chunks
+    so only the current chunk and one partial line are held in memory.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        buffer = pending + (chunk if isinstance(chunk, str) else decoder.decode(chunk))
+        lines = buffer.splitlines()
+        pending = ""
+        if lines and not buffer.endswith(_LINE_BREAKS):
+            pending = lines.pop()
+        yield from lines
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield from pending.splitlines()
+
+
+def iter_log_entries(
+    lines: Iterable[str],
+    log_format: Optional[LogFormat] = None,
+    leading: Optional[list[str]] = None,
+) -> Iterator[dict]:
+    """
+    Parses non-blank lines with the dedicated parser for their layout, sniffed
+    from the first lines when `log_format` is not given. Lines the parser does
+    not recognise fall back to the per-field heuristics.
+
+    Continuation lines (stack frames, wrapped messages: no date and no level)
+    are folded into the `stack` list of the dated entry before them instead of
+    becoming entries of their own, up to MAX_STACK_LINES. When `leading` is
+    given, continuation lines seen before the first entry are collected there
+    for the caller to fold.
+    """
+    lines = (line for line in lines if line.strip())
+    if log_format is None:
+        head = list(islice(lines, SNIFF_LINE_COUNT))
+        log_format = sniff_format(head)
+        lines = chain(head, lines)
+    parse = log_format.parse
+    index = 0
+    pending: Optional[dict] = None
+    for line in lines:
+        entry = parse(line, index)
+        if entry is None:
+            if _is_continuation(line):
+                if pending is not None and pending["date"]:
+                    append_stack_lines(pending, (line,))
+                    continue
+                if pending is None and leading is not None:
+                    leading.append(line)
+                    continue
+            entry = _parse_line_heuristic(line, index)
+        if pending is not None:
+            yield pending
+        pending = entry
+        index += 1
+    if pending is not None:
+        yield pending
 
 
-def _parse_line(line: str, index: int) -> dict:
+def append_stack_lines(entry: dict[str, Any], lines: Iterable[str]) -> None:
+    """
+    Folds continuation lines into the entry's `stack`, keeping the first
+    MAX_STACK_LINES and counting the rest in `stack_omitted`.
+    """
+    stack = entry.setdefault("stack", [])
+    for line in lines:
+        if len(stack) < MAX_STACK_LINES:
+            stack.append(line)
+        else:
+            entry["stack_omitted"] = entry.get("stack_omitted", 0) + 1
+
+
+def iter_entry_batches(
+    entries: Iterable[dict[str, Any]], batch_size: int = ENTRY_BATCH_SIZE
+) -> Iterator[list[dict[str, Any]]]:
+    iterator = iter(entries)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _is_continuation(line: str) -> bool:
+    return _DATE_RE.search(line) is None and _LEVEL_RE.search(line) is None
+
+
+def _parse_line_heuristic(line: str, index: int) -> dict:
     date_match = _DATE_RE.search(line)
     time_match = _TIME_RE.search(line)
     level_match = _LEVEL_RE.search(line)
@@ -29,12 +140,21 @@ def _parse_line(line: str, index: int) -> dict:
     if category_match:
         category = category_match.group(1).split(".")[-1] or "General"
 
+    date = date_match.group(0) if date_match else ""
+    time = time_match.group(0) if time_match else "00:00"
+    ts = None
+    timestamp_match = ISO_TIMESTAMP_RE.search(line)
+    if timestamp_match:
+        ts = to_epoch_ms(*timestamp_match.groups())
+    elif date:
+        ts = to_epoch_ms(date, time)
+
     return {
         "id": index + 1,
-        "date": date_match.group(0) if date_match else "",
-        "time": time_match.group(0) if time_match else "00:00",
+        "date": date,
+        "time": time,
+        "ts": ts,
         "level": level_match.group(1) if level_match else "INFO",
         "category": category,
         "message": message_part,
     }
-
@@ -0,0 +1,132 @@
+import io
+import os
+from collections import deque
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import Any, Iterable, Iterator, Optional
+
+from app.parsers.formats import SNIFF_LINE_COUNT, get_format, sniff_format
+from app.parsers.log_parser import append_stack_lines, iter_log_entries, iter_log_lines
+from app.workers import get_process_pool
+
+
+# Files are cut into line-aligned ranges of about this size, one pool task each.
+RANGE_BYTES = 8 * 1024 * 1024
+# Below this many bytes in total, parsing in-process beats the pool round trip.
+PARALLEL_MIN_BYTES = 2 * 1024 * 1024
+
+
+def iter_parsed_files(paths: list[str], workers: int) -> Iterator[Iterator[dict[str, Any]]]:
+    """
+    Yields one entry iterator per path, in order. With more than one worker the
+    files are split into byte ranges parsed across the shared process pool;
+    entries come back in file order with the same ids a serial parse gives.
+    Each iterator must be consumed before advancing to the next.
+    """
+    if workers <= 1 or sum(os.path.getsize(path) for path in paths) < PARALLEL_MIN_BYTES:
+        for path in paths:
+            yield _iter_file_entries(path)
+        return
+
+    tasks = []
+    file_formats = []
+    for file_index, path in enumerate(paths):
+        format_name = _sniff_file(path)
+        file_formats.append(format_name)
+        for start, end in split_line_ranges(path, RANGE_BYTES):
+            tasks.append((file_index, path, start, end, format_name))
+
+    results = _run_ordered(get_process_pool(workers), tasks, lookahead=workers * 2)
+    for file_index, group in groupby(results, key=itemgetter(0)):
+        format_name = file_formats[file_index]
+        yield _merge_ranges((result for _, result in group), format_name)
+
+
+def split_line_ranges(path: str, range_bytes: int) -> list[tuple[int, int]]:
+    """
+    Splits a file into (start, end) byte ranges of roughly `range_bytes`, each
+    ending just after a newline. An empty file still yields one empty range.
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    start = 0
+    with open(path, "rb") as handle:
+        while start < size:
+            handle.seek(min(start + range_bytes, size))
+            handle.readline()
+            end = min(handle.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges or [(0, 0)]
+
+
+def parse_byte_range(
+    path: str, start: int, end: int, format_name: str
+) -> tuple[list[str], list[dict[str, Any]]]:
+    """
+    Pool task: parses one line-aligned byte range. Continuation lines at the
+    very start belong to the previous range's last entry, so they are returned
+    separately for the merge to fold.
+    """
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        data = handle.read(end - start)
+    leading: list[str] = []
+    lines = iter_log_lines(io.BytesIO(data))
+    entries = list(iter_log_entries(lines, get_format(format_name), leading))
+    return leading, entries
+
+
+def _iter_file_entries(path: str) -> Iterator[dict[str, Any]]:
+    with open(path, "rb") as handle:
+        yield from iter_log_entries(iter_log_lines(handle))
+
+
+def _sniff_file(path: str) -> str:
+    with open(path, "rb") as handle:
+        lines = list(islice((line for line in iter_log_lines(handle) if line.strip()), SNIFF_LINE_COUNT))
+    return sniff_format(lines).name
+
+
+def _run_ordered(pool: Any, tasks: list[tuple], lookahead: int) -> Iterator[tuple[int, Any]]:
+    # Keeps at most `lookahead` ranges in flight so parsed-but-unwritten
+    # entries stay bounded, and yields results strictly in task order.
+    pending: deque = deque()
+    remaining = iter(tasks)
+    try:
+        while True:
+            for file_index, *args in islice(remaining, lookahead - len(pending)):
+                pending.append((file_index, pool.submit(parse_byte_range, *args)))
+            if not pending:
+                return
+            file_index, future = pending.popleft()
+            yield file_index, future.result()
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def _merge_ranges(
+    results: Iterable[tuple[list[str], list[dict[str, Any]]]], format_name: str
+) -> Iterator[dict[str, Any]]:
+    # Each range's last entry is held back until the next range arrives,
+    # since that range may open with continuation lines belonging to it.
+    next_id = 1
+    tail: Optional[dict[str, Any]] = None
+    for leading, entries in results:
+        if leading:
+            if tail is not None and tail["date"]:
+                append_stack_lines(tail, leading)
+            else:
+                entries = list(iter_log_entries(leading, get_format(format_name))) + entries
+        if not entries:
+            continue
+        if tail is not None:
+            yield tail
+        for entry in entries:
+            entry["id"] = next_id
+            next_id += 1
+        yield from entries[:-1]
+        tail = entries[-1]
+    if tail is not None:
+        yield tail
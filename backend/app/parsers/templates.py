@@ -0,0 +1,155 @@
+import re
+from collections import Counter
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+
+WILDCARD = "<*>"
+
+# Tokens containing a digit (ids, durations, status codes, IPs, hex) are
+# treated as parameters before clustering, in one pass over the message.
+_PARAMETER_TOKEN_RE = re.compile(r"\S*\d\S*")
+
+
+class TemplateMiner:
+    """
+    Online Drain-style template miner. Messages are routed through a
+    fixed-depth prefix tree (token count, then the first `depth - 2` tokens)
+    to a small leaf of candidate templates, and join the most similar one or
+    start a new template. Template ids are stable once assigned.
+
+    New ids come from `next_id` when given, so miners working on the same
+    project at the same time can draw them from one shared counter instead
+    of handing out the same id twice.
+    """
+    def __init__(
+        self,
+        depth: int = 4,
+        similarity_threshold: float = 0.4,
+        max_children: int = 100,
+        next_id: Optional[Callable[[], int]] = None,
+    ):
+        self.depth = depth
+        self.similarity_threshold = similarity_threshold
+        self.max_children = max_children
+        self._next_id = next_id
+        self._root: dict[int, dict] = {}
+        self._templates: dict[int, list[str]] = {}
+        self._counts: Counter[int] = Counter()
+        self._added: Counter[int] = Counter()
+        self._last_id = 0
+
+    @classmethod
+    def from_templates(cls, rows: Iterable[dict[str, Any]], **options: Any) -> "TemplateMiner":
+        """Rebuilds a miner from stored template rows, keeping their ids."""
+        miner = cls(**options)
+        for row in sorted(rows, key=lambda r: r["template_id"]):
+            tokens = row["template"].split()
+            template_id = row["template_id"]
+            miner._templates[template_id] = tokens
+            miner._counts[template_id] = row.get("count", 0)
+            miner._last_id = max(miner._last_id, template_id)
+            miner._leaf(tokens).append(template_id)
+        return miner
+
+    def add_message(self, message: str) -> int:
+        tokens = _PARAMETER_TOKEN_RE.sub(WILDCARD, message).split()
+        leaf = self._leaf(tokens)
+        template_id = self._best_match(leaf, tokens)
+        if template_id is None:
+            if self._next_id is not None:
+                template_id = self._next_id()
+            else:
+                template_id = self._last_id + 1
+            self._last_id = max(self._last_id, template_id)
+            self._templates[template_id] = tokens
+            leaf.append(template_id)
+        else:
+            template = self._templates[template_id]
+            for position, token in enumerate(tokens):
+                if template[position] != token:
+                    template[position] = WILDCARD
+        self._counts[template_id] += 1
+        self._added[template_id] += 1
+        return template_id
+
+    def assign(self, entries: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        for entry in entries:
+            entry["template_id"] = self.add_message(entry.get("message", ""))
+            yield entry
+
+    def templates(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "template_id": template_id,
+                "template": " ".join(tokens),
+                "count": self._counts[template_id],
+            }
+            for template_id, tokens in sorted(self._templates.items())
+            if self._counts[template_id]
+        ]
+
+    def changes(self) -> list[dict[str, Any]]:
+        """
+        The templates messages were added to since the miner was built, with
+        the number of messages `added` to each, for merging into the stored
+        templates (see merge_templates).
+        """
+        return [
+            {
+                "template_id": template_id,
+                "template": " ".join(self._templates[template_id]),
+                "added": added,
+            }
+            for template_id, added in sorted(self._added.items())
+        ]
+
+    def _leaf(self, tokens: list[str]) -> list[int]:
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[: self.depth - 2]:
+            children = node.setdefault("children", {})
+            child = children.get(token)
+            if child is None:
+                if token != WILDCARD and len(children) >= self.max_children:
+                    child = children.setdefault(WILDCARD, {})
+                else:
+                    child = children[token] = {}
+            node = child
+        return node.setdefault("templates", [])
+
+    def _best_match(self, leaf: list[int], tokens: list[str]) -> Optional[int]:
+        if not tokens:
+            return leaf[0] if leaf else None
+        # Similarity is the share of positions the template already covers;
+        # ties go to the template with more literal (non-wildcard) matches.
+        best_id = None
+        best_score = (-1.0, -1)
+        for template_id in leaf:
+            template = self._templates[template_id]
+            covered = 0
+            literal = 0
+            for template_token, token in zip(template, tokens):
+                if template_token == token:
+                    covered += 1
+                    literal += token != WILDCARD
+                elif template_token == WILDCARD:
+                    covered += 1
+            score = (covered / len(tokens), literal)
+            if score > best_score:
+                best_id, best_score = template_id, score
+        if best_id is None or best_score[0] < self.similarity_threshold:
+            return None
+        return best_id
+
+
+def merge_templates(stored: str, mined: str) -> str:
+    """
+    Combines two versions of one template: positions where either has a
+    wildcard, or where they disagree, become wildcards.
+    """
+    stored_tokens = stored.split()
+    mined_tokens = mined.split()
+    if len(stored_tokens) != len(mined_tokens):
+        return stored
+    return " ".join(
+        left if left == right else WILDCARD for left, right in zip(stored_tokens, mined_tokens)
+    )
@@ -1,22 +1,36 @@
-from typing import Any
+from typing import Any, Optional
 
 from bson import ObjectId
 
 from app.config import load_config
 from app.database import get_db
-from app.models.project import ProjectLogRepository
-from app.services.alert_engine import AlertRuleEngine, ErrorCountRule, KeywordMatchRule
+from app.models.project import (
+    ProjectAlertStateRepository,
+    ProjectLogRepository,
+    ProjectRepository,
+    ProjectRuleSetRepository,
+)
+from app.services.alert_engine import AlertRuleEngine
+from app.services.rule_sets import DEFAULT_RULES, get_rule_plan
 from app.rag.clients import HFAPIEmbeddings
 
 
-def ingest_project_logs(user_id: str, project_id: str) -> None:
+def ingest_project_logs(
+    user_id: str, project_id: str, file_ids: Optional[list[str]] = None
+) -> None:
+    """
+    Evaluates alert rules over the given newly added log files (all of the
+    project's files when `file_ids` is None) and embeds the new alerts. Rule
+    windows continue from the project's saved alert state, so only the new
+    files are read.
+    """
     db = get_db()
     collection = db["project_alert_embeddings"]
     alerts_collection = db["project_alerts"]
-    existing = collection.count_documents(
-        {"user_id": user_id, "project_id": project_id}, limit=1
-    )
-    if existing:
+    state_repo = ProjectAlertStateRepository()
+    state, version = state_repo.get_for_project(user_id=user_id, project_id=project_id)
+    if file_ids is None and state:
+        # Already evaluated; appended files must be passed explicitly.
         return
 
     config = load_config()
@@ -27,39 +41,43 @@ def ingest_project_logs(user_id: str, project_id: str) -> None:
         api_token=config.hf_token,
     )
 
-    log_repo = ProjectLogRepository()
-    files = log_repo.list_files_for_project(user_id=user_id, project_id=project_id)
+    rule_set = ProjectRuleSetRepository().get_for_project(
+        user_id=user_id, project_id=project_id
+    ) or {"version": 0, "rules": DEFAULT_RULES}
+    plan = get_rule_plan(project_id, rule_set["version"], rule_set["rules"])
+    # Rules run in-process: shipping every batch to the pool and rebuilding
+    # its timeline in each worker costs more than the evaluation itself.
+    engine = AlertRuleEngine(plan)
 
-    all_logs: list[dict[str, Any]] = []
-    for file in files:
-        for entry in file.entries:
-            all_logs.append(entry)
-            
-    rules = [
-        ErrorCountRule(time_window_minutes=1, threshold=1),
-        KeywordMatchRule(keyword="status=404", time_window_minutes=1, threshold=1),
-        KeywordMatchRule(keyword="Exception", time_window_minutes=2, threshold=1),
-        KeywordMatchRule(keyword="Failed", time_window_minutes=1, threshold=1)
-    ]
-    engine = AlertRuleEngine(rules)
-    alerts = engine.evaluate(all_logs)
-    
-    # Save raw alerts to database
-    docs_to_save = []
-    for alert in alerts:
-        doc = alert.copy()
-        doc["user_id"] = user_id
-        doc["project_id"] = project_id
-        doc["time_detected"] = alert["stats"].get("latest_timestamp")
-        docs_to_save.append(doc)
-    if docs_to_save:
+    # Uploads to one project can be ingested at the same time. Each evaluates
+    # from the state it read and saves only if no other ingest saved since;
+    # otherwise it starts over from the newer state, so no open window is
+    # lost and no event is counted twice. Alerts are stored once it saved.
+    while True:
+        alerts, next_state = _evaluate_new_logs(engine, user_id, project_id, file_ids, state)
+        if state_repo.save_for_project(
+            user_id=user_id, project_id=project_id, state=next_state, version=version
+        ):
+            break
+        state, version = state_repo.get_for_project(user_id=user_id, project_id=project_id)
+
+    if alerts:
+        # Save raw alerts to database
+        docs_to_save = []
+        for alert in alerts:
+            doc = alert.copy()
+            doc["user_id"] = user_id
+            doc["project_id"] = project_id
+            doc["time_detected"] = alert["stats"].get("latest_timestamp")
+            docs_to_save.append(doc)
         alerts_collection.insert_many(docs_to_save)
+        ProjectRepository().increment_alert_count(project_id, len(docs_to_save))
 
     texts: list[str] = []
     meta: list[dict[str, Any]] = []
     
     for alert in alerts:
-        example_log = alert["logs"][-1].get("message", "") if alert["logs"] else "No recent log"
+        example_log = alert["example_message"] or "No recent log"
         text = f"[ALERT] {alert['name']} (Severity: {alert['severity']}) - Reason: {alert['reason']} - Triggered by {alert['stats']['count']} logs. Example log: {example_log}"
         texts.append(text)
         meta.append(
@@ -86,3 +104,22 @@ def ingest_project_logs(user_id: str, project_id: str) -> None:
     if documents:
         collection.insert_many(documents)
 
+
+def _evaluate_new_logs(
+    engine: AlertRuleEngine,
+    user_id: str,
+    project_id: str,
+    file_ids: Optional[list[str]],
+    state: dict[str, dict[str, Any]],
+) -> tuple[list[dict[str, Any]], dict[str, dict[str, Any]]]:
+    # The new logs are read in time-ordered batches and evaluated one batch
+    # after another, each continuing from the state the previous one left,
+    # so memory stays bounded whatever the size of the files.
+    alerts: list[dict[str, Any]] = []
+    batches = ProjectLogRepository().iter_dated_batches(
+        user_id=user_id, project_id=project_id, file_ids=file_ids
+    )
+    for batch in batches:
+        batch_alerts, state = engine.evaluate_incremental(batch, state)
+        alerts.extend(batch_alerts)
+    return alerts, state
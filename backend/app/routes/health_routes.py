@@ -0,0 +1,21 @@
+import os
+from http import HTTPStatus
+from typing import Any
+
+from flask import Blueprint, g
+
+from app.database import get_pool_metrics
+from app.utils import error_response, json_response, require_auth
+
+
+health_bp = Blueprint("health", __name__)
+
+
+@health_bp.get("/metrics")
+@require_auth
+def metrics() -> Any:
+    current_user = getattr(g, "current_user", None)
+    if not isinstance(current_user, dict):
+        return error_response("Unauthorized", HTTPStatus.UNAUTHORIZED)
+    # The counters belong to the worker process that served the request.
+    return json_response({"pid": os.getpid(), "mongo_pool": get_pool_metrics()})
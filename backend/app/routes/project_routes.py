@@ -4,14 +4,35 @@ from typing import Any
 from flask import Blueprint, g, request
 
 from app.services.project_service import (
+    LOG_PAGE_PARAMS,
+    AlertNotFoundError,
+    DuplicateLogFileError,
     InvalidLogFileError,
+    InvalidLogQueryError,
     InvalidProjectPayloadError,
     ProjectNotFoundError,
+    add_logs_to_project,
     create_project_with_logs,
+    get_alert_logs,
+    get_project_files,
     get_project_logs,
+    get_project_logs_page,
+    get_project_rule_set,
+    get_project_stats,
+    get_project_templates,
+    iter_project_log_lines,
     list_projects,
+    update_project_rule_set,
+)
+from app.services.rule_sets import InvalidRuleSetError
+from app.utils import (
+    error_response,
+    json_response,
+    ndjson_response,
+    require_auth,
+    stream_json_response,
+    wants_ndjson,
 )
-from app.utils import error_response, json_response, require_auth
 from app.database import get_db
 from bson import ObjectId
 from app.rag.chat import chat_with_project
@@ -52,6 +73,42 @@ def create_project() -> Any:
     return json_response({"project_id": project_id, "embedding_started": True}, HTTPStatus.CREATED)
 
 
+@project_bp.post("/<project_id>/files")
+@require_auth
+def add_project_files(project_id: str) -> Any:
+    user = getattr(g, "current_user", None)
+    user_id = user.get("id") if isinstance(user, dict) else None
+    if not isinstance(user_id, str) or not user_id:
+        return error_response("Unauthorized", HTTPStatus.UNAUTHORIZED)
+
+    files = request.files.getlist("files")
+    try:
+        file_ids = add_logs_to_project(user_id=user_id, project_id=project_id, files=files)
+    except InvalidProjectPayloadError:
+        return error_response("Invalid payload", HTTPStatus.BAD_REQUEST)
+    except InvalidLogFileError:
+        return error_response("Invalid log file", HTTPStatus.BAD_REQUEST)
+    except DuplicateLogFileError:
+        return error_response("Log file already exists", HTTPStatus.CONFLICT)
+    except ProjectNotFoundError:
+        return error_response("Project not found", HTTPStatus.NOT_FOUND)
+    return json_response({"project_id": project_id, "file_ids": file_ids}, HTTPStatus.CREATED)
+
+
+@project_bp.get("/<project_id>/files")
+@require_auth
+def project_files(project_id: str) -> Any:
+    user = getattr(g, "current_user", None)
+    user_id = user.get("id") if isinstance(user, dict) else None
+    if not isinstance(user_id, str) or not user_id:
+        return error_response("Unauthorized", HTTPStatus.UNAUTHORIZED)
+    try:
+        data = get_project_files(user_id=user_id, project_id=project_id)
+    except ProjectNotFoundError:
+        return error_response("Project not found", HTTPStatus.NOT_FOUND)
+    return json_response(data)
+
+
 @project_bp.get("/<project_id>/logs")
 @require_auth
 def project_logs(project_id: str) -> Any:
@@ -60,12 +117,92 @@ def project_logs(project_id: str) -> Any:
     if not isinstance(user_id, str) or not user_id:
         return error_response("Unauthorized", HTTPStatus.UNAUTHORIZED)
     try:
+        if any(param in request.args for param in LOG_PAGE_PARAMS):
+            data = get_project_logs_page(
+                user_id=user_id, project_id=project_id, params=request.args
+            )
+            if wants_ndjson():
+                return ndjson_response(data["logs"])
+            return json_response(data)
+        if wants_ndjson():
+            return ndjson_response(
+                iter_project_log_lines(user_id=user_id, project_id=project_id)
+            )
+        # Files and entries are streamed straight from the database cursors.
         data = get_project_logs(user_id=user_id, project_id=project_id)
+    except InvalidLogQueryError:
+        return error_response("Invalid log query", HTTPStatus.BAD_REQUEST)
+    except ProjectNotFoundError:
+        return error_response("Project not found", HTTPStatus.NOT_FOUND)
+    return stream_json_response(data)
+
+
+@project_bp.get("/<project_id>/stats")
+@require_auth
+def project_stats(project_id: str) -> Any:
+    user = getattr(g, "current_user", None)
+    user_id = user.get("id") if isinstance(user, dict) else None
+    if not isinstance(user_id, str) or not user_id:
+        return error_response("Unauthorized", HTTPStatus.UNAUTHORIZED)
+    try:
+        data = get_project_stats(user_id=user_id, project_id=project_id, params=request.args)
+    except InvalidLogQueryError:
+        return error_response("Invalid stats query", HTTPStatus.BAD_REQUEST)
     except ProjectNotFoundError:
         return error_response("Project not found", HTTPStatus.NOT_FOUND)
     return json_response(data)
 
 
+@project_bp.get("/<project_id>/templates")
+@require_auth
+def project_templates(project_id: str) -> Any:
+    user = getattr(g, "current_user", None)
+    user_id = user.get("id") if isinstance(user, dict) else None
+    if not isinstance(user_id, str) or not user_id:
+        return error_response("Unauthorized", HTTPStatus.UNAUTHORIZED)
+    try:
+        data = get_project_templates(user_id=user_id, project_id=project_id)
+    except ProjectNotFoundError:
+        return error_response("Project not found", HTTPStatus.NOT_FOUND)
+    return json_response(data)
+
+
+@project_bp.get("/<project_id>/rules")
+@require_auth
+def project_rules(project_id: str) -> Any:
+    user = getattr(g, "current_user", None)
+    user_id = user.get("id") if isinstance(user, dict) else None
+    if not isinstance(user_id, str) or not user_id:
+        return error_response("Unauthorized", HTTPStatus.UNAUTHORIZED)
+    try:
+        data = get_project_rule_set(user_id=user_id, project_id=project_id)
+    except ProjectNotFoundError:
+        return error_response("Project not found", HTTPStatus.NOT_FOUND)
+    return json_response(data)
+
+
+@project_bp.put("/<project_id>/rules")
+@require_auth
+def update_project_rules(project_id: str) -> Any:
+    user = getattr(g, "current_user", None)
+    user_id = user.get("id") if isinstance(user, dict) else None
+    if not isinstance(user_id, str) or not user_id:
+        return error_response("Unauthorized", HTTPStatus.UNAUTHORIZED)
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return error_response("Invalid payload", HTTPStatus.BAD_REQUEST)
+    try:
+        result = update_project_rule_set(
+            user_id=user_id, project_id=project_id, rules=data.get("rules")
+        )
+    except InvalidRuleSetError as e:
+        return error_response(str(e), HTTPStatus.BAD_REQUEST)
+    except ProjectNotFoundError:
+        return error_response("Project not found", HTTPStatus.NOT_FOUND)
+    return json_response(result)
+
+
 @project_bp.post("/<project_id>/chat")
 @require_auth
 def chat_project(project_id: str) -> Any:
@@ -113,17 +250,36 @@ def project_alerts(project_id: str) -> Any:
             "project_id": project_id
         })
         
-        # Clean up Mongo ObjectIds before JSON serialization
-        alerts = []
-        for alert in cursor:
-            alert.pop("_id", None)
-            alert["project_id"] = str(alert["project_id"])
-            alerts.append(alert)
-        
-        return json_response({"alerts": alerts})
+        # Alerts are streamed from the cursor as they are serialized.
+        alerts = (_serialize_alert(alert) for alert in cursor)
+        if wants_ndjson():
+            return ndjson_response(alerts)
+        return stream_json_response({"alerts": alerts})
         
     except Exception as e:
         traceback.print_exc()
         err_msg = str(e) or repr(e)
         return error_response(err_msg, HTTPStatus.INTERNAL_SERVER_ERROR)
 
+
+def _serialize_alert(alert: dict[str, Any]) -> dict[str, Any]:
+    # Clean up Mongo ObjectIds before JSON serialization
+    alert["id"] = str(alert.pop("_id"))
+    alert["project_id"] = str(alert["project_id"])
+    return alert
+
+
+@project_bp.get("/<project_id>/alerts/<alert_id>/logs")
+@require_auth
+def project_alert_logs(project_id: str, alert_id: str) -> Any:
+    user = getattr(g, "current_user", None)
+    user_id = user.get("id") if isinstance(user, dict) else None
+    if not isinstance(user_id, str) or not user_id:
+        return error_response("Unauthorized", HTTPStatus.UNAUTHORIZED)
+    try:
+        data = get_alert_logs(user_id=user_id, project_id=project_id, alert_id=alert_id)
+    except ProjectNotFoundError:
+        return error_response("Project not found", HTTPStatus.NOT_FOUND)
+    except AlertNotFoundError:
+        return error_response("Alert not found", HTTPStatus.NOT_FOUND)
+    return json_response(data)
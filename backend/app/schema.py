@@ -0,0 +1,227 @@
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from pymongo import IndexModel, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.models.log_chunks import DEFAULT_CODEC, ENCODING, decode_entries, encode_entries
+from app.models.project import CHUNK_SIZE, chunk_document
+
+
+# Records which migrations have run, one document per version, plus the
+# lock document held while migrations are being applied.
+MIGRATIONS_COLLECTION = "schema_migrations"
+MIGRATION_LOCK_ID = "lock"
+# A lock older than this is taken to be left behind by a crashed process.
+MIGRATION_LOCK_TTL = timedelta(minutes=30)
+
+# Ordinary indexes of every collection, keyed by collection name. Creating an
+# index that already exists with the same definition is a no-op.
+INDEXES: dict[str, list[IndexModel]] = {
+    "users": [IndexModel([("username", 1)], unique=True)],
+    "projects": [IndexModel([("user_id", 1), ("created_at", -1)])],
+    "project_logs": [
+        IndexModel([("user_id", 1), ("project_id", 1)]),
+        IndexModel([("project_id", 1), ("created_at", -1)]),
+        # Unique per file per project — re-uploading same filename replaces existing
+        IndexModel([("user_id", 1), ("project_id", 1), ("filename", 1)], unique=True),
+    ],
+    "project_log_chunks": [
+        IndexModel([("project_id", 1), ("file_id", 1), ("min_ts", 1)]),
+        IndexModel([("file_id", 1), ("seq", 1)], unique=True),
+        IndexModel([("project_id", 1), ("file_id", 1), ("seq", 1)]),
+    ],
+    "project_log_rollups": [
+        IndexModel([("user_id", 1), ("project_id", 1), ("granularity", 1), ("start", 1)]),
+        IndexModel([("file_id", 1)]),
+    ],
+    "project_log_templates": [
+        IndexModel([("user_id", 1), ("project_id", 1), ("template_id", 1)], unique=True),
+    ],
+    "project_alert_state": [IndexModel([("user_id", 1), ("project_id", 1)], unique=True)],
+    "project_rule_sets": [IndexModel([("user_id", 1), ("project_id", 1)], unique=True)],
+    "project_alerts": [IndexModel([("user_id", 1), ("project_id", 1)])],
+    # Vector search over embeddings uses the Atlas search index instead
+    # (see create_index.py); this one serves plain per-project lookups.
+    "project_alert_embeddings": [IndexModel([("user_id", 1), ("project_id", 1)])],
+}
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Any], None]
+    # Data migrations rewrite stored documents, which can take long on a big
+    # database; they run from `flask migrate` rather than at startup.
+    data: bool = False
+
+
+class MigrationLockedError(Exception):
+    pass
+
+
+def _create_indexes(db: Any) -> None:
+    for name, indexes in INDEXES.items():
+        db[name].create_indexes(indexes)
+
+
+def _reencode_log_chunks(db: Any) -> None:
+    # Chunks in an older encoding (row documents, or columnar chunks without
+    # the filter arrays) are invisible to the logs page query.
+    chunks = db["project_log_chunks"]
+    cursor = chunks.find(
+        {"encoding": {"$ne": ENCODING}},
+        {"encoding": 1, "codec": 1, "columns": 1, "index": 1, "entries": 1},
+    )
+    updates = []
+    for chunk in cursor:
+        fields = encode_entries(decode_entries(chunk), DEFAULT_CODEC)
+        unset = {"index": "", "entries": ""}
+        updates.append(UpdateOne({"_id": chunk["_id"]}, {"$set": fields, "$unset": unset}))
+        if len(updates) >= 500:
+            chunks.bulk_write(updates, ordered=False)
+            updates = []
+    if updates:
+        chunks.bulk_write(updates, ordered=False)
+
+
+def _chunk_inline_entries(db: Any) -> None:
+    # Files stored before chunking keep their entries inline on the file
+    # document, where the logs page and stats queries do not look. Their
+    # rollups, if any, were built from the same entries and stay valid.
+    files = db["project_logs"]
+    chunks = db["project_log_chunks"]
+    for file_id in [doc["_id"] for doc in files.find({"entries": {"$exists": True}}, {"_id": 1})]:
+        doc = files.find_one({"_id": file_id})
+        if doc is None:
+            continue
+        entries = doc.get("entries") or []
+        documents = [
+            chunk_document(
+                user_id=doc["user_id"],
+                project_id=doc["project_id"],
+                file_id=file_id,
+                seq=seq,
+                entries=entries[offset:offset + CHUNK_SIZE],
+            )
+            for seq, offset in enumerate(range(0, len(entries), CHUNK_SIZE))
+        ]
+        chunks.delete_many({"file_id": file_id})
+        if documents:
+            chunks.insert_many(documents, ordered=False)
+        level_counts: Counter[str] = Counter()
+        for document in documents:
+            level_counts.update(document["level_counts"])
+        timestamps = [
+            ts for document in documents for ts in (document["min_ts"], document["max_ts"])
+            if ts is not None
+        ]
+        files.update_one(
+            {"_id": file_id},
+            {
+                "$set": {
+                    "entry_count": len(entries),
+                    "min_ts": min(timestamps, default=None),
+                    "max_ts": max(timestamps, default=None),
+                    "level_counts": dict(level_counts),
+                },
+                "$unset": {"entries": ""},
+            },
+        )
+
+
+# Applied in version order, each at most once per database, while holding
+# the migration lock. Append a new migration for every schema change; one
+# that only adds indexes to INDEXES can reuse _create_indexes. Migrations
+# must be safe to run twice, in case a lock expires mid-migration.
+MIGRATIONS: list[Migration] = [
+    Migration(1, "create indexes", _create_indexes),
+    Migration(
+        2, "move log chunk filter fields into an uncompressed index", _reencode_log_chunks, data=True
+    ),
+    # _reencode_log_chunks always writes the current encoding, so a database
+    # that runs 2 here has nothing left for 3.
+    Migration(
+        3, "store log chunk filter fields as per-chunk arrays", _reencode_log_chunks, data=True
+    ),
+    Migration(4, "move inline log file entries into chunks", _chunk_inline_entries, data=True),
+]
+
+
+def ensure_schema(db: Any) -> list[int]:
+    """
+    Applies the pending migrations that precede the first pending data
+    migration and returns their versions. Runs at startup, so request
+    handlers never issue DDL. Does nothing while another process holds the
+    migration lock.
+    """
+    try:
+        return _apply_migrations(db, include_data=False)
+    except MigrationLockedError:
+        return []
+
+
+def migrate(db: Any) -> list[int]:
+    """
+    Applies every pending migration, data migrations included, and returns
+    their versions. Raises MigrationLockedError if another process holds the
+    migration lock.
+    """
+    return _apply_migrations(db, include_data=True)
+
+
+def pending_migrations(db: Any) -> list[Migration]:
+    applied = {
+        doc["_id"]
+        for doc in db[MIGRATIONS_COLLECTION].find({}, {"_id": 1})
+        if isinstance(doc["_id"], int)
+    }
+    return [
+        migration
+        for migration in sorted(MIGRATIONS, key=lambda m: m.version)
+        if migration.version not in applied
+    ]
+
+
+def _apply_migrations(db: Any, *, include_data: bool) -> list[int]:
+    owner = uuid.uuid4().hex
+    versions = []
+    _acquire_lock(db, owner)
+    try:
+        for migration in pending_migrations(db):
+            if migration.data and not include_data:
+                break
+            # Renewed before every migration so a long run keeps the lock.
+            _acquire_lock(db, owner)
+            migration.apply(db)
+            db[MIGRATIONS_COLLECTION].replace_one(
+                {"_id": migration.version},
+                {
+                    "description": migration.description,
+                    "applied_at": datetime.now(timezone.utc),
+                },
+                upsert=True,
+            )
+            versions.append(migration.version)
+    finally:
+        db[MIGRATIONS_COLLECTION].delete_one({"_id": MIGRATION_LOCK_ID, "owner": owner})
+    return versions
+
+
+def _acquire_lock(db: Any, owner: str) -> None:
+    # The upsert inserts the lock document when there is none; when another
+    # owner holds an unexpired lock, the filter misses and the insert hits
+    # the existing _id.
+    now = datetime.now(timezone.utc)
+    try:
+        db[MIGRATIONS_COLLECTION].find_one_and_update(
+            {"_id": MIGRATION_LOCK_ID, "$or": [{"owner": owner}, {"expires_at": {"$lte": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + MIGRATION_LOCK_TTL}},
+            upsert=True,
+        )
+    except DuplicateKeyError as error:
+        raise MigrationLockedError from error
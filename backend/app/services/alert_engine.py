@@ -1,6 +1,22 @@
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Any, Callable
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import Any, Iterable, Optional, Sequence, Union
+
+import numpy as np
+
+from app.services.event_timeline import EventTimeline
+
+
+# From this many matching events up, windows are counted with numpy instead
+# of the pure-Python two-pointer loop.
+VECTORIZE_MIN_EVENTS = 1_000
+# Rate anomaly count series are scored this many minutes (about six months)
+# at a time, which bounds their memory whatever span the logs cover.
+ANOMALY_SLICE_MINUTES = 1 << 18
+# An EWMA baseline looks back this many spans; what lies further back has
+# decayed to nothing.
+EWMA_HISTORY_SPANS = 20
 
 @dataclass
 class Alert:
@@ -15,137 +31,687 @@ class Rule:
     def evaluate(self, logs: list[dict[str, Any]]) -> list[Alert]:
         raise NotImplementedError("Rules must implement evaluate()")
 
-    def _parse_time(self, log_time_str: str) -> datetime | None:
-        try:
-            return datetime.fromisoformat(log_time_str)
-        except (ValueError, TypeError):
-            return None
+    def evaluate_timeline(self, timeline: EventTimeline) -> list[Alert]:
+        # Rules that do not use the shared index see the raw logs.
+        return self.evaluate(timeline.source)
 
+    @property
+    def state_key(self) -> str:
+        """Identifies this rule's persisted state across evaluations."""
+        return type(self).__name__
 
-class ErrorCountRule(Rule):
+    def evaluate_incremental(
+        self, timeline: EventTimeline, state: Optional[dict[str, Any]]
+    ) -> tuple[list[Alert], Optional[dict[str, Any]]]:
+        """
+        Evaluates logs appended since the evaluation that returned `state`,
+        returning the new alerts and the state to pass next time. Rules that
+        keep no state between evaluations only see the new logs.
+        """
+        return self.evaluate_timeline(timeline), state
+
+
+class WindowedRule(Rule):
     """
-    Alerts if ERROR count > threshold in the specified time window (minutes).
+    Base for threshold-in-window rules. Windows are measured on the `ts`
+    epoch-millisecond field the parser sets at ingest; logs without one are
+    ignored, as undated logs always were.
     """
-    def __init__(self, time_window_minutes: int = 10, threshold: int = 5):
+    name = ""
+    severity = "HIGH"
+
+    def __init__(
+        self,
+        time_window_minutes: int = 10,
+        threshold: int = 5,
+        time_window_seconds: Optional[int] = None,
+    ):
         self.time_window_minutes = time_window_minutes
+        self.time_window_seconds = time_window_seconds
         self.threshold = threshold
-        self.name = "High Error Rate"
+        if time_window_seconds is not None:
+            self.window_ms = time_window_seconds * 1000
+        else:
+            self.window_ms = int(time_window_minutes * 60_000)
+
+    def select(self, timeline: EventTimeline) -> list[int]:
+        """Ascending timeline positions of the logs this rule counts."""
+        raise NotImplementedError("Windowed rules must implement select()")
+
+    def reason(self) -> str:
+        raise NotImplementedError("Windowed rules must implement reason()")
 
     def evaluate(self, logs: list[dict[str, Any]]) -> list[Alert]:
+        return self.evaluate_timeline(EventTimeline(logs))
+
+    def evaluate_timeline(self, timeline: EventTimeline) -> list[Alert]:
+        return self.evaluate_positions(timeline, self.select(timeline))
+
+    @property
+    def state_key(self) -> str:
+        return f"{self.name}|{self.window_ms}|{self.threshold}"
+
+    @property
+    def predicate_key(self) -> str:
+        """Identifies which events the rule counts; see WindowGroup."""
+        raise NotImplementedError("Windowed rules must implement predicate_key")
+
+    def evaluate_incremental(
+        self, timeline: EventTimeline, state: Optional[dict[str, Any]]
+    ) -> tuple[list[Alert], Optional[dict[str, Any]]]:
+        alerts, next_state = WindowGroup([self]).evaluate_incremental(timeline, state)
+        return alerts[0], next_state
+
+    def evaluate_positions(self, timeline: EventTimeline, positions: list[int]) -> list[Alert]:
+        return self.alerts_for_firings(
+            timeline, positions, self.window_firings(timeline, positions)
+        )
+
+    def window_firings(
+        self, timeline: EventTimeline, positions: list[int]
+    ) -> list[tuple[int, int]]:
+        if len(positions) >= VECTORIZE_MIN_EVENTS:
+            return window_firings_numpy(
+                timeline.timestamp_array(), positions, self.window_ms, self.threshold
+            )
+        return window_firings(timeline.timestamps, positions, self.window_ms, self.threshold)
+
+    def alerts_for_firings(
+        self,
+        timeline: EventTimeline,
+        positions: list[int],
+        firings: list[tuple[int, int]],
+    ) -> list[Alert]:
         alerts = []
-        
-        # Filter for ERROR logs only and parse times
-        error_logs = []
-        for log in logs:
-            if log.get("level") == "ERROR":
-                time_str = log.get("date", "") + "T" + log.get("time", "") if log.get("date") and log.get("time") else log.get("timestamp", "")
-                dt = self._parse_time(time_str)
-                if dt:
-                    error_logs.append((dt, log))
-                    
-        # Sort chronologically
-        error_logs.sort(key=lambda x: x[0])
-        
-        # Rolling window evaluation
-        for i, (end_time, _) in enumerate(error_logs):
-            window_logs = []
-            for j in range(i, -1, -1):
-                start_time, log = error_logs[j]
-                delta = end_time - start_time
-                if delta.total_seconds() / 60.0 <= self.time_window_minutes:
-                    window_logs.append(log)
-                else:
-                    break
-                    
-            if len(window_logs) >= self.threshold:
-                # To prevent spamming alerts for the exact same window,
-                # we only fire if this specific log tips the threshold.
-                if len(window_logs) == self.threshold:
-                    reason = f"Exceeded {self.threshold} ERROR logs within {self.time_window_minutes} minutes."
-                    alerts.append(
-                        Alert(
-                            name=self.name,
-                            reason=reason,
-                            severity="HIGH",
-                            stats={
-                                "count": len(window_logs),
-                                "time_window_minutes": self.time_window_minutes,
-                                "latest_timestamp": end_time.isoformat()
-                            },
-                            logs=window_logs
-                        )
-                    )
+        for start, end in firings:
+            # Window logs are listed newest first.
+            window_logs = [timeline.logs[positions[j]] for j in range(end, start - 1, -1)]
+            alerts.append(
+                Alert(
+                    name=self.name,
+                    reason=self.reason(),
+                    severity=self.severity,
+                    stats=self._window_stats(end - start + 1, timeline.timestamps[positions[end]]),
+                    logs=window_logs,
+                )
+            )
         return alerts
 
+    def _window_text(self) -> str:
+        if self.time_window_seconds is not None:
+            return f"{self.time_window_seconds} seconds"
+        return f"{self.time_window_minutes} minutes"
+
+    def _window_stats(self, count: int, end_ts: int) -> dict[str, Any]:
+        minutes = self.time_window_minutes
+        if self.time_window_seconds is not None:
+            minutes = round(self.time_window_seconds / 60, 2)
+        return {
+            "count": count,
+            "time_window_minutes": minutes,
+            "time_window_seconds": self.window_ms // 1000,
+            "latest_timestamp": format_timestamp(end_ts),
+        }
+
+
+def window_firings(
+    timestamps: Sequence[int], positions: Sequence[int], window_ms: int, threshold: int
+) -> list[tuple[int, int]]:
+    """
+    Two-pointer sliding window over the chronologically sorted events at
+    `positions`: each event's window is every earlier event at most
+    window_ms older. To avoid spamming alerts for the same window, a window
+    only fires when its newest event tips the count to exactly the
+    threshold. Returns (start, end) indexes into `positions`, inclusive.
+    """
+    firings = []
+    start = 0
+    for end, position in enumerate(positions):
+        end_ts = timestamps[position]
+        while end_ts - timestamps[positions[start]] > window_ms:
+            start += 1
+        if end - start + 1 == threshold:
+            firings.append((start, end))
+    return firings
+
+
+def window_firings_numpy(
+    timestamps: np.ndarray, positions: Sequence[int], window_ms: int, threshold: int
+) -> list[tuple[int, int]]:
+    """
+    Same result as window_firings, computed for every window at once. The
+    window ending at event `end` holds exactly `threshold` events when the
+    event threshold - 1 places earlier is inside it and the one threshold
+    places earlier is not, so two shifted differences decide every window.
+    """
+    if threshold < 1 or len(positions) < threshold:
+        return []
+    event_ts = timestamps[np.asarray(positions, dtype=np.intp)]
+    fires = event_ts[threshold - 1:] - event_ts[: len(event_ts) - threshold + 1] <= window_ms
+    fires[1:] &= event_ts[threshold:] - event_ts[: len(event_ts) - threshold] > window_ms
+    starts = np.flatnonzero(fires)
+    return [(start, start + threshold - 1) for start in starts.tolist()]
+
+
+class WindowGroup:
+    """
+    Windowed rules that count the same events over the same window and differ
+    only in threshold. They share one selection and one pass that finds each
+    event's window start; every rule then just compares the window counts
+    with its own threshold.
+    """
+    def __init__(self, rules: list[WindowedRule]):
+        self.rules = rules
+        self.window_ms = rules[0].window_ms
+        self.key = f"{rules[0].predicate_key}|{self.window_ms}"
+
+    def firings(
+        self, timeline: EventTimeline, positions: list[int]
+    ) -> list[list[tuple[int, int]]]:
+        if len(self.rules) == 1:
+            return [self.rules[0].window_firings(timeline, positions)]
+        event_ts = timeline.timestamp_array()[np.asarray(positions, dtype=np.intp)]
+        starts = np.searchsorted(event_ts, event_ts - self.window_ms, side="left")
+        counts = np.arange(len(positions)) - starts + 1
+        result = []
+        for rule in self.rules:
+            ends = np.flatnonzero(counts == rule.threshold)
+            result.append(list(zip(starts[ends].tolist(), ends.tolist())))
+        return result
+
+    def evaluate(self, timeline: EventTimeline) -> list[list[Alert]]:
+        positions = self.rules[0].select(timeline)
+        return [
+            rule.alerts_for_firings(timeline, positions, firings)
+            for rule, firings in zip(self.rules, self.firings(timeline, positions))
+        ]
+
+    def evaluate_incremental(
+        self, timeline: EventTimeline, state: Optional[dict[str, Any]]
+    ) -> tuple[list[list[Alert]], Optional[dict[str, Any]]]:
+        # The open window is carried over as the tail of the last `threshold`
+        # counted events (the largest threshold in the group): whether a later
+        # event tips its window to exactly the threshold depends on nothing
+        # older. New events are evaluated together with the tail, and only
+        # windows they close can fire.
+        state = state or {}
+        tail: list[dict[str, Any]] = state.get("tail", [])
+        new_logs = [timeline.logs[position] for position in self.rules[0].select(timeline)]
+        if not new_logs:
+            return [[] for _ in self.rules], state or None
+        tail_ids = {id(log) for log in tail}
+        events = EventTimeline(tail + new_logs)
+        positions = list(range(len(events)))
+        alerts = []
+        for rule, firings in zip(self.rules, self.firings(events, positions)):
+            firings = [(start, end) for start, end in firings if id(events.logs[end]) not in tail_ids]
+            alerts.append(rule.alerts_for_firings(events, positions, firings))
+        newest_ts = events.timestamps[-1]
+        keep = max(rule.threshold for rule in self.rules)
+        next_tail = []
+        if keep > 0:
+            # Only what a later window needs is kept: where the log is and when.
+            next_tail = [
+                {"file_id": log.get("file_id"), "id": log.get("id"), "ts": log["ts"]}
+                for log in events.logs[-keep:]
+                if newest_ts - log["ts"] <= self.window_ms
+            ]
+        return alerts, {"tail": next_tail}
+
+
+def log_refs(logs: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Compacts logs to references: per file id, the entry ids as inclusive
+    [first, last] ranges of consecutive ids.
+    """
+    keys = sorted(
+        (str(log.get("file_id") or ""), log["id"]) for log in logs if log.get("id") is not None
+    )
+    refs = []
+    for file_id, group in groupby(keys, key=lambda key: key[0]):
+        ranges: list[list[int]] = []
+        for _, entry_id in group:
+            if ranges and entry_id <= ranges[-1][1] + 1:
+                ranges[-1][1] = max(ranges[-1][1], entry_id)
+            else:
+                ranges.append([entry_id, entry_id])
+        refs.append({"file_id": file_id or None, "ranges": ranges})
+    return refs
+
+
+def format_timestamp(ts: int) -> str:
+    return datetime.fromtimestamp(ts / 1000, tz=timezone.utc).isoformat(timespec="milliseconds")
+
 
-class KeywordMatchRule(Rule):
+class ErrorCountRule(WindowedRule):
+    """
+    Alerts if ERROR count > threshold in the specified time window (minutes,
+    or seconds when time_window_seconds is given).
+    """
+    def __init__(
+        self,
+        time_window_minutes: int = 10,
+        threshold: int = 5,
+        time_window_seconds: Optional[int] = None,
+    ):
+        super().__init__(time_window_minutes, threshold, time_window_seconds)
+        self.name = "High Error Rate"
+
+    @property
+    def predicate_key(self) -> str:
+        return "level:ERROR"
+
+    def select(self, timeline: EventTimeline) -> list[int]:
+        return timeline.level_positions("ERROR")
+
+    def reason(self) -> str:
+        return f"Exceeded {self.threshold} ERROR logs within {self._window_text()}."
+
+
+class KeywordMatchRule(WindowedRule):
     """
     Alerts if a specific keyword appears > threshold times in a time window.
     """
-    def __init__(self, keyword: str, time_window_minutes: int = 10, threshold: int = 5):
+    def __init__(
+        self,
+        keyword: str,
+        time_window_minutes: int = 10,
+        threshold: int = 5,
+        time_window_seconds: Optional[int] = None,
+    ):
+        super().__init__(time_window_minutes, threshold, time_window_seconds)
         self.keyword = keyword
-        self.time_window_minutes = time_window_minutes
-        self.threshold = threshold
         self.name = f"Frequent Keyword: '{keyword}'"
+        self.severity = "MEDIUM" if threshold < 10 else "HIGH"
+
+    @property
+    def predicate_key(self) -> str:
+        return f"keyword:{self.keyword}"
+
+    def select(self, timeline: EventTimeline) -> list[int]:
+        return timeline.keyword_positions(self.keyword)
+
+    def reason(self) -> str:
+        return f"Keyword '{self.keyword}' seen {self.threshold} times within {self._window_text()}."
+
+
+class RateAnomalyRule(Rule):
+    """
+    Alerts when the per-minute rate of one level, category or template jumps
+    well above its baseline: an EWMA ("ewma"), a rolling window ("zscore")
+    or the same minute in previous seasons ("seasonal"). A minute fires when
+    it has at least `min_count` events and sits `z_threshold` standard
+    deviations above the baseline; a run of such minutes fires once.
+    """
+    severity = "HIGH"
+    fields = ("level", "category", "template_id")
+    methods = ("ewma", "zscore", "seasonal")
+
+    def __init__(
+        self,
+        field: str = "level",
+        value: Any = "ERROR",
+        method: str = "ewma",
+        z_threshold: float = 3.0,
+        min_count: int = 5,
+        window_minutes: int = 30,
+        season_minutes: int = 1440,
+        seasons: int = 7,
+    ):
+        if field not in self.fields:
+            raise ValueError(f"Unsupported anomaly field: {field}")
+        if method not in self.methods:
+            raise ValueError(f"Unsupported anomaly method: {method}")
+        self.field = field
+        self.value = value
+        self.method = method
+        self.z_threshold = z_threshold
+        self.min_count = min_count
+        self.window_minutes = window_minutes
+        self.season_minutes = season_minutes
+        self.seasons = seasons
+        self.name = f"Rate Anomaly: {field}={value}"
+
+    @property
+    def state_key(self) -> str:
+        return (
+            f"{self.name}|{self.method}|{self.z_threshold}|{self.min_count}"
+            f"|{self.window_minutes}|{self.season_minutes}|{self.seasons}"
+        )
+
+    def select(self, timeline: EventTimeline) -> list[int]:
+        return timeline.field_positions(self.field, self.value)
 
     def evaluate(self, logs: list[dict[str, Any]]) -> list[Alert]:
+        return self.evaluate_timeline(EventTimeline(logs))
+
+    def evaluate_timeline(self, timeline: EventTimeline) -> list[Alert]:
+        return self.evaluate_incremental(timeline, None)[0]
+
+    def evaluate_incremental(
+        self, timeline: EventTimeline, state: Optional[dict[str, Any]]
+    ) -> tuple[list[Alert], Optional[dict[str, Any]]]:
+        # The state carries the trailing minutes of the count series that the
+        # baseline looks back over, so new logs extend the series in place.
+        positions = self.select(timeline)
+        minutes, counts = timeline.minute_counts(positions)
+        if not len(minutes):
+            return [], state
+        # The series starts at the timeline's first minute, so quiet minutes
+        # before the first event still count towards the baseline.
+        first = int(timeline.minute_array()[0])
+        origin = first
+        last_fired = None
+        if state:
+            history = np.asarray(state["counts"], dtype=np.int64)
+            held = np.flatnonzero(history)
+            minutes = np.concatenate((state["start_minute"] + held, minutes))
+            counts = np.concatenate((history[held], counts))
+            origin = min(first, state["start_minute"])
+            last_fired = state.get("last_fired_minute")
+        minutes, counts = _sum_by_minute(
+            np.concatenate(([origin], minutes)), np.concatenate(([0], counts))
+        )
+
+        event_minutes = timeline.minute_array()[np.asarray(positions, dtype=np.intp)]
         alerts = []
-        
-        keyword_logs = []
-        for log in logs:
-            message = str(log.get("message", ""))
-            if self.keyword in message:
-                time_str = log.get("date", "") + "T" + log.get("time", "") if log.get("date") and log.get("time") else log.get("timestamp", "")
-                dt = self._parse_time(time_str)
-                if dt:
-                    keyword_logs.append((dt, log))
-                    
-        keyword_logs.sort(key=lambda x: x[0])
-        
-        for i, (end_time, _) in enumerate(keyword_logs):
-            window_logs = []
-            for j in range(i, -1, -1):
-                start_time, log = keyword_logs[j]
-                delta = end_time - start_time
-                if delta.total_seconds() / 60.0 <= self.time_window_minutes:
-                    window_logs.append(log)
-                else:
-                    break
-                    
-            if len(window_logs) >= self.threshold:
-                if len(window_logs) == self.threshold:
-                    reason = f"Keyword '{self.keyword}' seen {self.threshold} times within {self.time_window_minutes} minutes."
-                    alerts.append(
-                        Alert(
-                            name=self.name,
-                            reason=reason,
-                            severity="MEDIUM" if self.threshold < 10 else "HIGH",
-                            stats={
-                                "count": len(window_logs),
-                                "time_window_minutes": self.time_window_minutes,
-                                "latest_timestamp": end_time.isoformat()
-                            },
-                            logs=window_logs
-                        )
-                    )
-        return alerts
+        for minute, count, expected, spread in self._anomalies(minutes, counts):
+            if minute < first or (last_fired is not None and minute <= last_fired):
+                continue
+            low, high = np.searchsorted(event_minutes, [minute, minute + 1]).tolist()
+            if low == high:
+                # Anomalous only through counts kept from earlier logs.
+                continue
+            # Window logs are listed newest first, as for windowed rules.
+            minute_logs = [timeline.logs[positions[j]] for j in range(high - 1, low - 1, -1)]
+            alerts.append(
+                Alert(
+                    name=self.name,
+                    reason=(
+                        f"{count} {self.value} logs in one minute, expected about "
+                        f"{expected:.1f} ({self.method} baseline)."
+                    ),
+                    severity=self.severity,
+                    stats={
+                        "count": count,
+                        "expected": round(expected, 2),
+                        "z_score": round((count - expected) / spread, 2),
+                        "method": self.method,
+                        "minute": format_timestamp(minute * 60_000),
+                        "latest_timestamp": format_timestamp(minute_logs[0]["ts"]),
+                    },
+                    logs=minute_logs,
+                )
+            )
+            last_fired = minute
 
+        last = int(minutes[-1])
+        start = max(int(minutes[0]), last - self._history_minutes() + 1)
+        held = slice(int(np.searchsorted(minutes, start)), None)
+        tail = np.zeros(last - start + 1, dtype=np.int64)
+        tail[minutes[held] - start] = counts[held]
+        return alerts, {
+            "start_minute": start,
+            "counts": tail.tolist(),
+            "last_fired_minute": last_fired,
+        }
 
-class AlertRuleEngine:
+    def _anomalies(
+        self, minutes: np.ndarray, counts: np.ndarray
+    ) -> Iterable[tuple[int, int, float, float]]:
+        """
+        The first minute of every anomalous run in the per-minute counts
+        given sparsely as ascending `minutes`, as (minute, count, expected,
+        spread). The baseline never looks back further than the history
+        minutes, so longer quiet stretches are shortened to that length, and
+        the series is built and scored ANOMALY_SLICE_MINUTES at a time: logs
+        spanning decades cost no more than the minutes that had events.
+        """
+        lookback = self._history_minutes()
+        offsets = np.concatenate(([0], np.cumsum(np.minimum(np.diff(minutes), lookback + 1))))
+        length = int(offsets[-1]) + 1
+        previous = False
+        for begin in range(0, length, ANOMALY_SLICE_MINUTES):
+            end = min(begin + ANOMALY_SLICE_MINUTES, length)
+            context = max(begin - lookback, 0)
+            low, high = np.searchsorted(offsets, [context, end]).tolist()
+            series = np.zeros(end - context, dtype=np.int64)
+            series[offsets[low:high] - context] = counts[low:high]
+            mean, std = self._baseline(series.astype(np.float64))
+            # Counts are at least Poisson-noisy, so the spread is never taken
+            # as less than sqrt(mean) (or 1), which keeps quiet baselines from
+            # turning every small bump into an anomaly.
+            with np.errstate(invalid="ignore"):
+                spread = np.maximum(np.maximum(std, np.sqrt(mean)), 1.0)
+                anomalous = (series >= self.min_count) & (
+                    series - mean >= self.z_threshold * spread
+                )
+            anomalous = anomalous[begin - context:]
+            run_starts = np.flatnonzero(anomalous & ~np.concatenate(([previous], anomalous[:-1])))
+            previous = bool(anomalous[-1])
+            for index in (run_starts + begin - context).tolist():
+                offset = context + index
+                point = int(np.searchsorted(offsets, offset, side="right")) - 1
+                yield (
+                    int(minutes[point]) + offset - int(offsets[point]),
+                    int(series[index]),
+                    float(mean[index]),
+                    float(spread[index]),
+                )
+
+    def _history_minutes(self) -> int:
+        if self.method == "seasonal":
+            return self.season_minutes * self.seasons
+        if self.method == "ewma":
+            return EWMA_HISTORY_SPANS * self.window_minutes
+        return self.window_minutes
+
+    def _baseline(self, series: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        if self.method == "ewma":
+            return ewma_baseline(series, self.window_minutes)
+        if self.method == "zscore":
+            return rolling_baseline(series, self.window_minutes)
+        return seasonal_baseline(series, self.season_minutes, self.seasons)
+
+
+def _sum_by_minute(minutes: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sorts sparse per-minute counts by minute, adding up repeated minutes."""
+    distinct, inverse = np.unique(minutes, return_inverse=True)
+    totals = np.zeros(len(distinct), dtype=np.int64)
+    np.add.at(totals, inverse, counts)
+    return distinct, totals
+
+
+def ewma_baseline(series: np.ndarray, span: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Exponentially weighted mean and standard deviation of the minutes before
+    each minute (alpha = 2 / (span + 1)); NaN until `span` minutes are seen.
+    """
+    mean = np.full(len(series), np.nan)
+    std = np.full(len(series), np.nan)
+    span = max(span, 1)
+    if len(series) <= span:
+        return mean, std
+    alpha = 2.0 / (span + 1)
+    running_mean = np.empty(len(series))
+    running_mean[0] = series[0]
+    running_mean[1:] = _exponential_filter(alpha * series[1:], 1 - alpha, series[0])
+    delta = series[1:] - running_mean[:-1]
+    running_var = np.empty(len(series))
+    running_var[0] = 0.0
+    running_var[1:] = _exponential_filter((1 - alpha) * alpha * delta * delta, 1 - alpha, 0.0)
+    # The baseline for a minute is the running state after the minute before.
+    mean[span:] = running_mean[span - 1:-1]
+    std[span:] = np.sqrt(running_var[span - 1:-1])
+    return mean, std
+
+
+def _exponential_filter(
+    inputs: np.ndarray, decay: float, initial: float, block: int = 256
+) -> np.ndarray:
+    """
+    y[i] = decay * y[i - 1] + inputs[i] with y[-1] = initial, computed a
+    block at a time as one matrix product instead of a Python loop.
+    """
+    steps = np.arange(block)
+    lags = steps[:, None] - steps[None, :]
+    weights = np.where(lags >= 0, decay ** np.maximum(lags, 0), 0.0)
+    carry = decay ** (steps + 1)
+    output = np.empty(len(inputs))
+    previous = initial
+    for begin in range(0, len(inputs), block):
+        chunk = inputs[begin:begin + block]
+        size = len(chunk)
+        output[begin:begin + size] = weights[:size, :size] @ chunk + carry[:size] * previous
+        previous = output[begin + size - 1]
+    return output
+
+
+def rolling_baseline(series: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """Mean and standard deviation of the `window` minutes before each minute."""
+    mean = np.full(len(series), np.nan)
+    std = np.full(len(series), np.nan)
+    if window < 1 or len(series) <= window:
+        return mean, std
+    sums = np.concatenate(([0.0], np.cumsum(series)))
+    squares = np.concatenate(([0.0], np.cumsum(series * series)))
+    window_sum = sums[window:-1] - sums[:-window - 1]
+    window_squares = squares[window:-1] - squares[:-window - 1]
+    mean[window:] = window_sum / window
+    std[window:] = np.sqrt(np.maximum(window_squares / window - mean[window:] ** 2, 0.0))
+    return mean, std
+
+
+def seasonal_baseline(
+    series: np.ndarray, period: int, seasons: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Mean and standard deviation of the same minute in up to `seasons`
+    previous periods; NaN until one full period is seen.
+    """
+    totals = np.zeros(len(series))
+    squares = np.zeros(len(series))
+    seen = np.zeros(len(series))
+    for season in range(1, seasons + 1):
+        lag = season * period
+        if lag >= len(series):
+            break
+        totals[lag:] += series[:-lag]
+        squares[lag:] += series[:-lag] ** 2
+        seen[lag:] += 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(seen > 0, totals / seen, np.nan)
+        std = np.sqrt(np.maximum(squares / seen - mean ** 2, 0.0))
+    return mean, std
+
+
+class RulePlan:
+    """
+    A rule list compiled for evaluation. Shared predicates are pushed down
+    into the timeline index (every keyword is found in one scan of the
+    messages, levels are indexed once) and windowed rules counting the same
+    events over the same window are merged into one WindowGroup pass, so the
+    cost grows with the distinct predicates rather than the rule count.
+    Plans are immutable and safe to cache and reuse.
+    """
     def __init__(self, rules: list[Rule]):
         self.rules = rules
+        self.keywords = list(
+            dict.fromkeys(rule.keyword for rule in rules if isinstance(rule, KeywordMatchRule))
+        )
+        # Evaluation units in order of first appearance, each with the
+        # indexes of the rules it answers for.
+        self.units: list[tuple[Any, list[int]]] = []
+        groups: dict[tuple[str, int], list[int]] = {}
+        for index, rule in enumerate(rules):
+            if isinstance(rule, WindowedRule):
+                key = (rule.predicate_key, rule.window_ms)
+                if key not in groups:
+                    groups[key] = []
+                    self.units.append((key, groups[key]))
+                groups[key].append(index)
+            else:
+                self.units.append((_SingleRule(rule), [index]))
+        self.units = [
+            (WindowGroup([rules[i] for i in indexes]) if isinstance(unit, tuple) else unit, indexes)
+            for unit, indexes in self.units
+        ]
+
+    def run(
+        self, logs: list[dict[str, Any]], state: Optional[dict[str, dict[str, Any]]]
+    ) -> tuple[list[list[dict[str, Any]]], dict[str, dict[str, Any]]]:
+        """
+        Each rule's alerts as dicts, in rule order, and, when `state` is given
+        (incremental evaluation), the next state keyed by evaluation unit.
+        """
+        # Sort and index the logs once; every rule then only pays for its
+        # own matching events.
+        timeline = EventTimeline(logs, keywords=self.keywords)
+        results: list[list[dict[str, Any]]] = [[] for _ in self.rules]
+        next_state = {}
+        for unit, indexes in self.units:
+            if state is None:
+                unit_alerts = unit.evaluate(timeline)
+            else:
+                unit_alerts, unit_state = unit.evaluate_incremental(timeline, state.get(unit.key))
+                if unit_state is not None:
+                    next_state[unit.key] = unit_state
+            for index, alerts in zip(indexes, unit_alerts):
+                results[index] = [_alert_to_dict(alert) for alert in alerts]
+        return results, next_state
+
+
+class _SingleRule:
+    """Adapts a rule evaluated on its own to the WindowGroup interface."""
+    def __init__(self, rule: Rule):
+        self.rule = rule
+        self.key = rule.state_key
+
+    def evaluate(self, timeline: EventTimeline) -> list[list[Alert]]:
+        return [self.rule.evaluate_timeline(timeline)]
+
+    def evaluate_incremental(
+        self, timeline: EventTimeline, state: Optional[dict[str, Any]]
+    ) -> tuple[list[list[Alert]], Optional[dict[str, Any]]]:
+        alerts, next_state = self.rule.evaluate_incremental(timeline, state)
+        return [alerts], next_state
+
+
+class AlertRuleEngine:
+    """
+    Evaluates a rule list, or a compiled RulePlan, over one shared timeline.
+    """
+    def __init__(self, rules: Union[list[Rule], RulePlan]):
+        self.plan = rules if isinstance(rules, RulePlan) else RulePlan(rules)
+        self.rules = self.plan.rules
 
     def evaluate(self, logs: list[dict[str, Any]]) -> list[dict[str, Any]]:
-        all_alerts = []
-        for rule in self.rules:
-            alerts = rule.evaluate(logs)
-            for alert in alerts:
-                # Convert dataclass to dict for JSON serialization
-                all_alerts.append({
-                    "name": alert.name,
-                    "severity": alert.severity,
-                    "reason": alert.reason,
-                    "stats": alert.stats,
-                    "logs": alert.logs
-                })
-        return all_alerts
+        results, _ = self.plan.run(logs, None)
+        return [alert for alerts in results for alert in alerts]
+
+    def evaluate_incremental(
+        self, logs: list[dict[str, Any]], state: dict[str, dict[str, Any]]
+    ) -> tuple[list[dict[str, Any]], dict[str, dict[str, Any]]]:
+        """
+        Evaluates only newly added logs, advancing each rule's open windows
+        from `state` (as returned by the previous call) rather than
+        re-reading older logs. Returns the new alerts and the next state.
+        Logs dated before a rule's last counted event still count, but windows
+        that closed before it are not revisited.
+        """
+        results, next_state = self.plan.run(logs, state)
+        return [alert for alerts in results for alert in alerts], next_state
+
+
+def _alert_to_dict(alert: Alert) -> dict[str, Any]:
+    # Convert dataclass to dict for JSON serialization. The evidence logs are
+    # kept as references (see log_refs) and resolved only when asked for;
+    # the newest one's message is kept to describe the alert.
+    return {
+        "name": alert.name,
+        "severity": alert.severity,
+        "reason": alert.reason,
+        "stats": alert.stats,
+        "log_refs": log_refs(alert.logs),
+        "example_message": str(alert.logs[0].get("message", "")) if alert.logs else "",
+    }
@@ -0,0 +1,115 @@
+from collections import defaultdict
+from operator import itemgetter
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+from app.services.keyword_matcher import KeywordMatcher
+
+
+# Below this many keywords, per-keyword substring checks are cheaper than
+# driving the automaton character by character; the two break even around
+# here (see benchmarks/keyword_index.py).
+KEYWORD_AUTOMATON_MIN = 48
+
+
+class EventTimeline:
+    """
+    One chronological index over a set of logs, built once per evaluation and
+    shared by every rule. Dated logs are stably sorted by `ts` into `logs`
+    with a parallel `timestamps` list; rules select events as ascending
+    positions into them, by level, category or message keyword.
+    """
+    def __init__(self, logs: list[dict[str, Any]], keywords: Iterable[str] = ()):
+        self.source = logs
+        self.logs = sorted(
+            (log for log in logs if log.get("ts") is not None), key=itemgetter("ts")
+        )
+        self.timestamps: list[int] = [log["ts"] for log in self.logs]
+        self._by_level: dict[Any, list[int]] = defaultdict(list)
+        self._by_category: dict[Any, list[int]] = defaultdict(list)
+        self._by_template: dict[Any, list[int]] = defaultdict(list)
+        for position, log in enumerate(self.logs):
+            self._by_level[log.get("level")].append(position)
+            self._by_category[log.get("category")].append(position)
+            self._by_template[log.get("template_id")].append(position)
+        self._by_keyword: dict[str, list[int]] = {}
+        self._timestamp_array: Optional[np.ndarray] = None
+        self._minute_array: Optional[np.ndarray] = None
+        self.index_keywords(keywords)
+
+    def __len__(self) -> int:
+        return len(self.logs)
+
+    def timestamp_array(self) -> np.ndarray:
+        """`timestamps` as an int64 array, built on first use."""
+        if self._timestamp_array is None:
+            self._timestamp_array = np.asarray(self.timestamps, dtype=np.int64)
+        return self._timestamp_array
+
+    def minute_array(self) -> np.ndarray:
+        """Each log's minute since the epoch, as an int64 array."""
+        if self._minute_array is None:
+            self._minute_array = self.timestamp_array() // 60_000
+        return self._minute_array
+
+    def minute_counts(self, positions: list[int]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Per-minute event counts for the logs at `positions`: the distinct
+        minutes they fall in, ascending, and the count for each. Minutes
+        without events are left out, so the result grows with the events
+        rather than with the span of time they cover.
+        """
+        minutes = self.minute_array()[np.asarray(positions, dtype=np.intp)]
+        if not len(minutes):
+            return minutes, np.zeros(0, dtype=np.int64)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(minutes)) + 1))
+        return minutes[starts], np.diff(np.append(starts, len(minutes)))
+
+    def level_positions(self, level: str) -> list[int]:
+        return self._by_level.get(level, [])
+
+    def category_positions(self, category: str) -> list[int]:
+        return self._by_category.get(category, [])
+
+    def template_positions(self, template_id: int) -> list[int]:
+        return self._by_template.get(template_id, [])
+
+    def field_positions(self, field: str, value: Any) -> list[int]:
+        """Positions of the logs whose level, category or template_id is `value`."""
+        if field == "level":
+            return self.level_positions(value)
+        if field == "category":
+            return self.category_positions(value)
+        if field == "template_id":
+            return self.template_positions(value)
+        raise ValueError(f"Unsupported field: {field}")
+
+    def keyword_positions(self, keyword: str) -> list[int]:
+        if keyword not in self._by_keyword:
+            self.index_keywords([keyword])
+        return self._by_keyword[keyword]
+
+    def index_keywords(self, keywords: Iterable[str]) -> None:
+        """Finds every not-yet-indexed keyword in one scan of the messages."""
+        pending = [k for k in dict.fromkeys(keywords) if k not in self._by_keyword]
+        if not pending:
+            return
+        found: dict[str, list[int]] = {keyword: [] for keyword in pending}
+        if "" in found:
+            found[""] = list(range(len(self.logs)))
+        searched = [keyword for keyword in pending if keyword]
+        if len(searched) >= KEYWORD_AUTOMATON_MIN:
+            matcher = KeywordMatcher(searched)
+            lists = [found[keyword] for keyword in matcher.keywords]
+            for position, log in enumerate(self.logs):
+                for index in matcher.find(str(log.get("message", ""))):
+                    lists[index].append(position)
+        elif searched:
+            lists = [found[keyword] for keyword in searched]
+            for position, log in enumerate(self.logs):
+                message = str(log.get("message", ""))
+                for keyword, positions in zip(searched, lists):
+                    if keyword in message:
+                        positions.append(position)
+        self._by_keyword.update(found)
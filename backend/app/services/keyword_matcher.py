@@ -0,0 +1,53 @@
+from collections import deque
+from typing import Iterable
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed keyword set. `find` scans a text once
+    and reports every keyword it contains, however many keywords there are.
+    Transitions are precomputed into a full DFA over the keywords' alphabet,
+    so the scan is a single dict lookup per character.
+    """
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = list(dict.fromkeys(k for k in keywords if k))
+        goto: list[dict[str, int]] = [{}]
+        outputs: list[set[int]] = [set()]
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append(set())
+                state = next_state
+            outputs[state].add(index)
+
+        # Breadth-first pass: fail links, inherited outputs, and completing
+        # each state's transitions with those of its fail state.
+        fail = [0] * len(goto)
+        delta: list[dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] |= outputs[fail[state]]
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            for char, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(char, 0) if state else 0
+                queue.append(child)
+        self._delta = delta
+        self._outputs = [frozenset(found) for found in outputs]
+
+    def find(self, text: str) -> set[int]:
+        """Indices into `keywords` of every keyword occurring in `text`."""
+        delta = self._delta
+        outputs = self._outputs
+        found: set[int] = set()
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
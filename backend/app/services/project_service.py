@@ -1,19 +1,53 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any
-
+import base64
+import binascii
+import os
+import re
+import shutil
+import tempfile
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Iterator, Mapping, Optional
+
+from bson import ObjectId
 from werkzeug.datastructures import FileStorage
 
-from app.models.project import Project, ProjectLogFile, ProjectLogRepository, ProjectRepository
-from app.parsers.log_parser import parse_log_text
+from app.database import get_db
+
+from app.models.log_rollups import GRANULARITIES, merge_rollups
+from app.models.project import (
+    Project,
+    ProjectLogFile,
+    ProjectLogRepository,
+    ProjectLogTemplateRepository,
+    ProjectRepository,
+    ProjectRuleSetRepository,
+)
+from app.parsers.compression import DECOMPRESSION_ERRORS, is_log_filename, open_log_stream
+from app.parsers.log_parser import iter_entry_batches
+from app.parsers.parallel import iter_parsed_files
+from app.parsers.templates import TemplateMiner
+from app.services.rule_sets import DEFAULT_RULES, validate_rule_set
 import threading
 from flask import current_app
 from app.rag.ingest import ingest_project_logs
 
 
 
-MAX_LOG_FILE_BYTES = 15 * 1024 * 1024
+MAX_LOG_FILE_BYTES = 512 * 1024 * 1024
+# Template ids reserved from the project's counter at a time during upload.
+TEMPLATE_ID_BLOCK = 64
+
+DEFAULT_LOG_PAGE_SIZE = 200
+MAX_LOG_PAGE_SIZE = 1000
+# Any of these query parameters switches GET /logs to the paginated form.
+LOG_PAGE_PARAMS = ("limit", "cursor", "file_id", "level", "category", "start", "end", "q")
+
+DEFAULT_STATS_GRANULARITY = "hour"
+
+_LEVEL_PARAM_RE = re.compile(r"^[A-Za-z]+$")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
 
 class InvalidProjectPayloadError(Exception):
@@ -28,31 +62,85 @@ class ProjectNotFoundError(Exception):
     pass
 
 
+class DuplicateLogFileError(Exception):
+    pass
+
+
+class AlertNotFoundError(Exception):
+    pass
+
+
+class InvalidLogQueryError(Exception):
+    pass
+
+
 @dataclass
 class ProjectListItem:
     project_id: str
     name: str
     created_at: str
     log_file_count: int = 0
+    entry_count: int = 0
+    alert_count: int = 0
+    last_ingest_at: Optional[str] = None
 
 
 def list_projects(user_id: str) -> list[ProjectListItem]:
+    """
+    The user's projects with their counters, read from the project documents
+    in one query whatever the number of projects.
+    """
     repo = ProjectRepository()
-    log_repo = ProjectLogRepository()
     projects = repo.list_for_user(user_id)
+    if any(not p.has_counters for p in projects):
+        projects = _backfill_project_counters(repo, user_id, projects)
     return [
         ProjectListItem(
             project_id=p.id,
             name=p.name,
             created_at=p.created_at.isoformat(),
-            log_file_count=log_repo.count_files_for_project(
-                user_id=user_id, project_id=p.id
-            ),
+            log_file_count=p.file_count,
+            entry_count=p.entry_count,
+            alert_count=p.alert_count,
+            last_ingest_at=p.last_ingest_at.isoformat() if p.last_ingest_at else None,
         )
         for p in projects
     ]
 
 
+def _backfill_project_counters(
+    repo: ProjectRepository, user_id: str, projects: list[Project]
+) -> list[Project]:
+    # Projects created before the counters were kept get them once, from one
+    # aggregation per collection for all of them.
+    missing = [p.id for p in projects if not p.has_counters]
+    summaries = ProjectLogRepository().summarize_projects(user_id=user_id, project_ids=missing)
+    alert_counts = {
+        doc["_id"]: doc["count"]
+        for doc in get_db()["project_alerts"].aggregate(
+            [
+                {"$match": {"user_id": user_id, "project_id": {"$in": missing}}},
+                {"$group": {"_id": "$project_id", "count": {"$sum": 1}}},
+            ]
+        )
+    }
+    counters = {
+        project_id: {
+            "file_count": 0,
+            "entry_count": 0,
+            "last_ingest_at": None,
+            **summaries.get(project_id, {}),
+            "alert_count": alert_counts.get(project_id, 0),
+        }
+        for project_id in missing
+    }
+    repo.set_counters(counters)
+    return [
+        replace(p, **counters[p.id], has_counters=True) if p.id in counters else p
+        for p in projects
+    ]
+
+
 def create_project_with_logs(
     *, user_id: str, name: str, files: list[FileStorage]
 ) -> str:
@@ -63,63 +151,410 @@ def create_project_with_logs(
         raise InvalidProjectPayloadError
 
     project_repo = ProjectRepository()
-    log_repo = ProjectLogRepository()
-
     project = project_repo.create(user_id=user_id, name=clean_name)
 
-    for file in files:
-        _ensure_valid_log_file(file)
-        text = _read_text_with_limit(file, MAX_LOG_FILE_BYTES)
-        entries = parse_log_text(text)
-        log_repo.add_file_logs(
-            user_id=user_id,
-            project_id=project.id,
-            filename=file.filename or "unknown.log",
-            entries=entries,
+    file_ids = _store_log_files(user_id=user_id, project_id=project.id, files=files)
+    ingest_project_logs(user_id, project.id, file_ids)
+
+    return project.id
+
+
+def add_logs_to_project(
+    *, user_id: str, project_id: str, files: list[FileStorage]
+) -> list[str]:
+    if not files:
+        raise InvalidProjectPayloadError
+
+    project_repo = ProjectRepository()
+    project = project_repo.find_for_user(user_id, project_id)
+    if project is None:
+        raise ProjectNotFoundError
+
+    # Replacing a file here would evaluate its new entries against alert
+    # state still holding the old ones, and leave earlier alerts pointing at
+    # entries that no longer exist, so names must be new to the project.
+    filenames = [file.filename or "unknown.log" for file in files]
+    if len(set(filenames)) != len(filenames) or ProjectLogRepository().find_existing_filenames(
+        user_id=user_id, project_id=project.id, filenames=filenames
+    ):
+        raise DuplicateLogFileError
+
+    file_ids = _store_log_files(user_id=user_id, project_id=project.id, files=files)
+    # Only the new files are evaluated; rule windows continue from the
+    # project's saved alert state.
+    ingest_project_logs(user_id, project.id, file_ids)
+    return file_ids
+
+
+def _store_log_files(
+    *, user_id: str, project_id: str, files: list[FileStorage]
+) -> list[str]:
+    log_repo = ProjectLogRepository()
+    spooled: list[tuple[str, str]] = []
+    file_ids: list[str] = []
+    try:
+        for file in files:
+            _ensure_valid_log_file(file)
+            spooled.append((file.filename or "unknown.log", _spool_upload(file)))
+
+        # New template ids come from the project's counter, so concurrent
+        # uploads never give the same id to different templates.
+        project_repo = ProjectRepository()
+        template_repo = ProjectLogTemplateRepository()
+        stored_templates = template_repo.list_for_project(user_id=user_id, project_id=project_id)
+        project_repo.start_template_ids(
+            project_id, max((t["template_id"] for t in stored_templates), default=0)
+        )
+        template_ids = _reserved_template_ids(project_repo, project_id)
+        miner = TemplateMiner.from_templates(
+            stored_templates, next_id=lambda: next(template_ids)
+        )
+        parsed_files = iter_parsed_files(
+            [path for _, path in spooled], workers=current_app.config["WORKER_POOL_SIZE"]
+        )
+        for (filename, _), entries in zip(spooled, parsed_files):
+            log_file = log_repo.add_file_log_batches(
+                user_id=user_id,
+                project_id=project_id,
+                filename=filename,
+                batches=iter_entry_batches(miner.assign(entries)),
+            )
+            file_ids.append(log_file.id)
+        template_repo.merge_for_project(
+            user_id=user_id, project_id=project_id, changes=miner.changes()
         )
+        # Recounted from the file metadata, since a re-uploaded file replaces
+        # an existing one rather than adding to the counts.
+        summary = log_repo.summarize_projects(
+            user_id=user_id, project_ids=[project_id]
+        ).get(project_id, {})
+        project_repo.set_log_counters(
+            project_id,
+            file_count=summary.get("file_count", 0),
+            entry_count=summary.get("entry_count", 0),
+            ingested_at=datetime.now(timezone.utc),
+        )
+    finally:
+        for _, path in spooled:
+            os.remove(path)
+    return file_ids
 
-    ingest_project_logs(user_id, project.id)
 
-    return project.id
+def _reserved_template_ids(project_repo: ProjectRepository, project_id: str) -> Iterator[int]:
+    # Ids are reserved a block at a time; unused ones are simply skipped.
+    while True:
+        yield from project_repo.reserve_template_ids(project_id, TEMPLATE_ID_BLOCK)
 
 
 def get_project_logs(*, user_id: str, project_id: str) -> dict[str, Any]:
+    """
+    Every log file of a project with its entries. Files and entries are lazy
+    iterators read from database cursors, meant for stream_json_response.
+    """
     project_repo = ProjectRepository()
     project = project_repo.find_for_user(user_id, project_id)
     if project is None:
         raise ProjectNotFoundError
 
     log_repo = ProjectLogRepository()
-    files = log_repo.list_files_for_project(user_id=user_id, project_id=project_id)
+    files = log_repo.iter_files_for_project(user_id=user_id, project_id=project_id)
     return {
         "project_id": project.id,
-        "files": [_serialize_project_log_file(f) for f in files],
+        "files": (_serialize_project_log_file(f, log_repo) for f in files),
     }
 
 
-def _serialize_project_log_file(file: ProjectLogFile) -> dict[str, Any]:
+def get_project_files(*, user_id: str, project_id: str) -> dict[str, Any]:
+    """A project's log files, newest first, with their counters but no entries."""
+    project_repo = ProjectRepository()
+    project = project_repo.find_for_user(user_id, project_id)
+    if project is None:
+        raise ProjectNotFoundError
+
+    files = ProjectLogRepository().iter_files_for_project(user_id=user_id, project_id=project_id)
+    return {
+        "project_id": project.id,
+        "files": [
+            {
+                "file_id": file.id,
+                "filename": file.filename,
+                "created_at": file.created_at.isoformat(),
+                "entry_count": file.entry_count,
+                "min_ts": file.min_ts,
+                "max_ts": file.max_ts,
+                "level_counts": file.level_counts,
+            }
+            for file in files
+        ],
+    }
+
+
+def iter_project_log_lines(*, user_id: str, project_id: str) -> Iterator[dict[str, Any]]:
+    """Every entry of a project, tagged with its filename, for NDJSON export."""
+    data = get_project_logs(user_id=user_id, project_id=project_id)
+    return (
+        {"filename": file["filename"], **entry}
+        for file in data["files"]
+        for entry in file["logs"]
+    )
+
+
+def get_project_logs_page(
+    *, user_id: str, project_id: str, params: Mapping[str, str]
+) -> dict[str, Any]:
+    """
+    One page of a project's log entries, filtered in the database. Takes the
+    LOG_PAGE_PARAMS query parameters: `limit`, `cursor` (the previous page's
+    `next_cursor`), `file_id`, `level` and `category` (comma-separated),
+    `start`/`end` (epoch milliseconds or ISO-8601, inclusive) and `q` (a
+    case-insensitive message substring). Raises InvalidLogQueryError.
+    """
+    project_repo = ProjectRepository()
+    project = project_repo.find_for_user(user_id, project_id)
+    if project is None:
+        raise ProjectNotFoundError
+
+    limit = _parse_int(params.get("limit"), DEFAULT_LOG_PAGE_SIZE)
+    if not 1 <= limit <= MAX_LOG_PAGE_SIZE:
+        raise InvalidLogQueryError
+    levels = _split_param(params.get("level"))
+    if any(not _LEVEL_PARAM_RE.match(level) for level in levels):
+        raise InvalidLogQueryError
+
+    log_repo = ProjectLogRepository()
+    logs, last = log_repo.find_entries_page(
+        user_id=user_id,
+        project_id=project_id,
+        limit=limit,
+        after=_decode_cursor(params.get("cursor")),
+        file_id=params.get("file_id") or None,
+        levels=[level.upper() for level in levels],
+        categories=_split_param(params.get("category")),
+        start_ts=_parse_time(params.get("start")),
+        end_ts=_parse_time(params.get("end")),
+        text=params.get("q") or None,
+    )
+    next_cursor = _encode_cursor(*last) if last is not None else None
+    return {"project_id": project.id, "logs": logs, "next_cursor": next_cursor}
+
+
+def get_project_stats(
+    *, user_id: str, project_id: str, params: Mapping[str, str]
+) -> dict[str, Any]:
+    """
+    Entry counts of a project by level, category and template, per minute or
+    per hour, read from the rollups written at ingest. Takes `granularity`
+    (`minute` or `hour`), `start`/`end` (as for the logs page) and `file_id`.
+    Raises InvalidLogQueryError.
+    """
+    project_repo = ProjectRepository()
+    project = project_repo.find_for_user(user_id, project_id)
+    if project is None:
+        raise ProjectNotFoundError
+
+    granularity = params.get("granularity") or DEFAULT_STATS_GRANULARITY
+    if granularity not in GRANULARITIES:
+        raise InvalidLogQueryError
+    start_ts = _parse_time(params.get("start"))
+    end_ts = _parse_time(params.get("end"))
+
+    rows = ProjectLogRepository().find_rollups(
+        user_id=user_id,
+        project_id=project_id,
+        granularity=granularity,
+        start_ts=start_ts,
+        end_ts=end_ts,
+        file_id=params.get("file_id") or None,
+    )
+    buckets, totals = merge_rollups(rows)
+    return {
+        "project_id": project.id,
+        "granularity": granularity,
+        "start": start_ts,
+        "end": end_ts,
+        "totals": totals,
+        "buckets": buckets,
+    }
+
+
+def get_project_templates(*, user_id: str, project_id: str) -> dict[str, Any]:
+    project_repo = ProjectRepository()
+    project = project_repo.find_for_user(user_id, project_id)
+    if project is None:
+        raise ProjectNotFoundError
+
+    template_repo = ProjectLogTemplateRepository()
+    return {
+        "project_id": project.id,
+        "templates": template_repo.list_for_project(user_id=user_id, project_id=project_id),
+    }
+
+
+def get_project_rule_set(*, user_id: str, project_id: str) -> dict[str, Any]:
+    project_repo = ProjectRepository()
+    project = project_repo.find_for_user(user_id, project_id)
+    if project is None:
+        raise ProjectNotFoundError
+
+    rule_set = ProjectRuleSetRepository().get_for_project(
+        user_id=user_id, project_id=project_id
+    )
+    if rule_set is None:
+        return {"project_id": project.id, "version": 0, "rules": DEFAULT_RULES}
+    return {"project_id": project.id, "version": rule_set["version"], "rules": rule_set["rules"]}
+
+
+def update_project_rule_set(
+    *, user_id: str, project_id: str, rules: Any
+) -> dict[str, Any]:
+    """
+    Replaces a project's alert rules. They apply to log files added from now
+    on; alerts already raised are kept. Raises InvalidRuleSetError.
+    """
+    project_repo = ProjectRepository()
+    project = project_repo.find_for_user(user_id, project_id)
+    if project is None:
+        raise ProjectNotFoundError
+
+    rule_set = ProjectRuleSetRepository().save_for_project(
+        user_id=user_id, project_id=project_id, rules=validate_rule_set(rules)
+    )
+    return {"project_id": project.id, "version": rule_set["version"], "rules": rule_set["rules"]}
+
+
+def get_alert_logs(*, user_id: str, project_id: str, alert_id: str) -> dict[str, Any]:
+    """Resolves an alert's log references to its evidence logs, newest first."""
+    project_repo = ProjectRepository()
+    project = project_repo.find_for_user(user_id, project_id)
+    if project is None:
+        raise ProjectNotFoundError
+    if not ObjectId.is_valid(alert_id):
+        raise AlertNotFoundError
+
+    alert = get_db()["project_alerts"].find_one(
+        {"_id": ObjectId(alert_id), "user_id": user_id, "project_id": project_id},
+        {"log_refs": 1},
+    )
+    if alert is None:
+        raise AlertNotFoundError
+
+    log_repo = ProjectLogRepository()
+    logs: list[dict[str, Any]] = []
+    for ref in alert.get("log_refs") or []:
+        if not ref.get("file_id"):
+            continue
+        logs.extend(
+            log_repo.find_entries(
+                user_id=user_id,
+                project_id=project_id,
+                file_id=ref["file_id"],
+                ranges=ref["ranges"],
+            )
+        )
+    logs.sort(key=lambda log: (log.get("ts") or 0, log.get("id") or 0), reverse=True)
+    return {"alert_id": alert_id, "logs": logs}
+
+
+def _serialize_project_log_file(
+    file: ProjectLogFile, log_repo: ProjectLogRepository
+) -> dict[str, Any]:
     return {
         "filename": file.filename,
         "created_at": file.created_at.isoformat(),
-        "logs": file.entries,
+        "logs": log_repo.iter_entries(file),
     }
 
 
+def _split_param(value: Optional[str]) -> list[str]:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+def _parse_int(value: Optional[str], default: int) -> int:
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError as error:
+        raise InvalidLogQueryError from error
+
+
+def _parse_time(value: Optional[str]) -> Optional[int]:
+    """Epoch milliseconds, or an ISO-8601 timestamp (UTC unless it says otherwise)."""
+    if value is None or value == "":
+        return None
+    if value.lstrip("-").isdigit():
+        return int(value)
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError as error:
+        raise InvalidLogQueryError from error
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return (moment - _EPOCH) // timedelta(milliseconds=1)
+
+
+def _encode_cursor(file_id: str, seq: int, position: int) -> str:
+    raw = f"{file_id}:{seq}:{position}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[tuple[str, int, int]]:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        file_id, seq, position = raw.rsplit(":", 2)
+        after = file_id, int(seq), int(position)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        raise InvalidLogQueryError from error
+    if after[1] < 0 or after[2] < 0:
+        raise InvalidLogQueryError
+    return after
+
+
 def _ensure_valid_log_file(file: FileStorage) -> None:
     filename = file.filename or ""
-    if not filename.lower().endswith(".log"):
+    if not is_log_filename(filename):
         raise InvalidLogFileError
     if file.content_length is not None and file.content_length > MAX_LOG_FILE_BYTES:
         raise InvalidLogFileError
 
 
-def _read_text_with_limit(file: FileStorage, limit: int) -> str:
-    data = file.stream.read(limit + 1)
-    if data is None:
-        raise InvalidLogFileError
-    if len(data) > limit:
-        raise InvalidLogFileError
-    if isinstance(data, str):
+def _spool_upload(file: FileStorage) -> str:
+    # Uploads are decompressed and copied to a named temp file so pool
+    # workers can open them and seek to their own byte ranges. The size
+    # limit counts decompressed bytes, which also stops compression bombs.
+    with tempfile.NamedTemporaryFile(suffix=".log", delete=False) as spool:
+        try:
+            stream = open_log_stream(file.stream, file.filename or "")
+            shutil.copyfileobj(_LimitedStream(stream, MAX_LOG_FILE_BYTES), spool)
+        except DECOMPRESSION_ERRORS as error:
+            spool.close()
+            os.remove(spool.name)
+            raise InvalidLogFileError from error
+        except InvalidLogFileError:
+            spool.close()
+            os.remove(spool.name)
+            raise
+    return spool.name
+
+
+class _LimitedStream:
+    """
+    Wraps an upload stream and raises InvalidLogFileError once more than
+    `limit` bytes have been read from it.
+    """
+    def __init__(self, stream: BinaryIO, limit: int):
+        self._stream = stream
+        self._limit = limit
+        self._consumed = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        if data is None:
+            raise InvalidLogFileError
+        self._consumed += len(data)
+        if self._consumed > self._limit:
+            raise InvalidLogFileError
         return data
-    return data.decode("utf-8", errors="replace")
 
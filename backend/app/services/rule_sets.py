@@ -0,0 +1,117 @@
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from app.services.alert_engine import (
+    ErrorCountRule,
+    KeywordMatchRule,
+    RateAnomalyRule,
+    Rule,
+    RulePlan,
+)
+
+
+# The rules every project starts with (version 0) until it saves its own.
+DEFAULT_RULES: list[dict[str, Any]] = [
+    {"type": "error_count", "time_window_minutes": 1, "threshold": 1},
+    {"type": "keyword", "keyword": "status=404", "time_window_minutes": 1, "threshold": 1},
+    {"type": "keyword", "keyword": "Exception", "time_window_minutes": 2, "threshold": 1},
+    {"type": "keyword", "keyword": "Failed", "time_window_minutes": 1, "threshold": 1},
+    {"type": "rate_anomaly", "field": "level", "value": "ERROR", "method": "ewma"},
+]
+
+MAX_RULES = 500
+PLAN_CACHE_SIZE = 256
+
+_WINDOW_PARAMS = {"time_window_minutes": int, "time_window_seconds": int, "threshold": int}
+
+# Rule type -> (class, accepted parameters and their types, required parameters)
+_RULE_TYPES: dict[str, tuple[type, dict[str, Any], set[str]]] = {
+    "error_count": (ErrorCountRule, _WINDOW_PARAMS, set()),
+    "keyword": (KeywordMatchRule, {**_WINDOW_PARAMS, "keyword": str}, {"keyword"}),
+    "rate_anomaly": (
+        RateAnomalyRule,
+        {
+            "field": str,
+            "value": (str, int),
+            "method": str,
+            "z_threshold": (int, float),
+            "min_count": int,
+            "window_minutes": int,
+            "season_minutes": int,
+            "seasons": int,
+        },
+        set(),
+    ),
+}
+
+_plan_cache: "OrderedDict[tuple[str, int], RulePlan]" = OrderedDict()
+_plan_cache_lock = threading.Lock()
+
+
+class InvalidRuleSetError(Exception):
+    pass
+
+
+def validate_rule_set(specs: Any) -> list[dict[str, Any]]:
+    """Checks a rule-set payload and returns it as a list of rule specs."""
+    if not isinstance(specs, list) or len(specs) > MAX_RULES:
+        raise InvalidRuleSetError(f"rules must be a list of at most {MAX_RULES} rules")
+    for spec in specs:
+        build_rule(spec)
+    return specs
+
+
+def build_rule(spec: Any) -> Rule:
+    if not isinstance(spec, dict):
+        raise InvalidRuleSetError("each rule must be an object")
+    rule_type = spec.get("type")
+    if rule_type not in _RULE_TYPES:
+        raise InvalidRuleSetError(f"unknown rule type: {rule_type!r}")
+    rule_class, accepted, required = _RULE_TYPES[rule_type]
+    params = {key: value for key, value in spec.items() if key != "type"}
+    unknown = set(params) - set(accepted)
+    if unknown:
+        raise InvalidRuleSetError(f"unknown {rule_type} parameters: {sorted(unknown)}")
+    missing = required - set(params)
+    if missing:
+        raise InvalidRuleSetError(f"missing {rule_type} parameters: {sorted(missing)}")
+    for key, value in params.items():
+        # bool is an int subclass, but never a meaningful window or threshold.
+        if isinstance(value, bool) or not isinstance(value, accepted[key]):
+            raise InvalidRuleSetError(f"invalid {rule_type} parameter: {key}")
+        if isinstance(value, (int, float)) and value <= 0:
+            raise InvalidRuleSetError(f"{rule_type} parameter {key} must be positive")
+        if isinstance(value, str) and not value:
+            raise InvalidRuleSetError(f"{rule_type} parameter {key} must not be empty")
+    if "time_window_minutes" in params and "time_window_seconds" in params:
+        raise InvalidRuleSetError(
+            f"{rule_type} takes time_window_minutes or time_window_seconds, not both"
+        )
+    try:
+        return rule_class(**params)
+    except (TypeError, ValueError) as error:
+        raise InvalidRuleSetError(str(error)) from error
+
+
+def compile_rule_set(specs: list[dict[str, Any]]) -> RulePlan:
+    return RulePlan([build_rule(spec) for spec in specs])
+
+
+def get_rule_plan(project_id: str, version: int, specs: list[dict[str, Any]]) -> RulePlan:
+    """
+    The compiled plan for one version of a project's rule set. Saving a rule
+    set bumps its version, so (project_id, version) never goes stale.
+    """
+    key = (project_id, version)
+    with _plan_cache_lock:
+        plan = _plan_cache.get(key)
+        if plan is not None:
+            _plan_cache.move_to_end(key)
+            return plan
+    plan = compile_rule_set(specs)
+    with _plan_cache_lock:
+        _plan_cache[key] = plan
+        while len(_plan_cache) > PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    return plan
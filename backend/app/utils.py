@@ -1,7 +1,7 @@
-from typing import Any, Callable, TypeVar
+from typing import Any, Callable, Iterable, Iterator, TypeVar
 from functools import wraps
 
-from flask import Response, jsonify, request, g
+from flask import Response, current_app, jsonify, request, g, stream_with_context
 
 from app.services.auth_service import InvalidTokenError, decode_access_token
 
@@ -14,6 +14,78 @@ def error_response(message: str, status: int) -> Response:
     return json_response({"error": message}, status)
 
 
+NDJSON_MIMETYPE = "application/x-ndjson"
+# Serialized output is handed to the server in writes of about this size.
+STREAM_BUFFER_CHARS = 64 * 1024
+
+
+def wants_ndjson() -> bool:
+    """Whether the client asked for NDJSON, by Accept header or ?format=ndjson."""
+    if request.args.get("format") == "ndjson":
+        return True
+    return request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def stream_json_response(data: dict[str, Any], status: int = 200) -> Response:
+    """
+    Like json_response, but any iterator inside `data` (at any depth, e.g. a
+    Mongo cursor or generator) is written out as a JSON array while it is
+    consumed. The body is sent in chunks as it is serialized, so neither the
+    documents nor the JSON text are ever held in full.
+    """
+    return Response(
+        stream_with_context(_buffered(_iter_json(data))),
+        status=status,
+        mimetype="application/json",
+    )
+
+
+def ndjson_response(items: Iterable[Any], status: int = 200) -> Response:
+    """Streams `items` as newline-delimited JSON, one document per line."""
+    dumps = current_app.json.dumps
+    return Response(
+        stream_with_context(_buffered(dumps(item) + "\n" for item in items)),
+        status=status,
+        mimetype=NDJSON_MIMETYPE,
+    )
+
+
+def _iter_json(value: Any) -> Iterator[str]:
+    dumps = current_app.json.dumps
+    if isinstance(value, dict):
+        if not any(isinstance(item, Iterator) for item in value.values()):
+            yield dumps(value)
+            return
+        yield "{"
+        for index, (key, item) in enumerate(value.items()):
+            yield ("," if index else "") + dumps(str(key)) + ":"
+            yield from _iter_json(item)
+        yield "}"
+    elif isinstance(value, Iterator):
+        yield "["
+        for index, item in enumerate(value):
+            if index:
+                yield ","
+            yield from _iter_json(item)
+        yield "]"
+    else:
+        yield dumps(value)
+
+
+def _buffered(fragments: Iterable[str]) -> Iterator[str]:
+    buffer: list[str] = []
+    size = 0
+    for fragment in fragments:
+        buffer.append(fragment)
+        size += len(fragment)
+        if size >= STREAM_BUFFER_CHARS:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
 F = TypeVar("F", bound=Callable[..., Any])
 
 
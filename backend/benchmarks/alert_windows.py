@@ -0,0 +1,100 @@
+"""
+Checks the sliding-window ErrorCountRule/KeywordMatchRule against the
+previous evaluation, which rebuilt every window by walking backwards from
+each matching log, and times both on bursty synthetic data.
+
+Run from the backend directory:
+    python -m benchmarks.alert_windows [burst_size]
+"""
+import random
+import sys
+import time
+from operator import itemgetter
+from typing import Any
+
+from app.services.alert_engine import Alert, ErrorCountRule, KeywordMatchRule, WindowedRule
+
+
+def _matches(rule: WindowedRule, log: dict[str, Any]) -> bool:
+    if isinstance(rule, KeywordMatchRule):
+        return rule.keyword in str(log.get("message", ""))
+    return log.get("level") == "ERROR"
+
+
+def _legacy_evaluate(rule: WindowedRule, logs: list[dict[str, Any]]) -> list[Alert]:
+    # The O(n*w) loop the rules used before the sliding window.
+    events = [(log["ts"], log) for log in logs if _matches(rule, log) and log.get("ts") is not None]
+    events.sort(key=itemgetter(0))
+    alerts = []
+    for i, (end_ts, _) in enumerate(events):
+        window_logs = []
+        for j in range(i, -1, -1):
+            start_ts, log = events[j]
+            if end_ts - start_ts <= rule.window_ms:
+                window_logs.append(log)
+            else:
+                break
+        if len(window_logs) == rule.threshold:
+            alerts.append(
+                Alert(
+                    name=rule.name,
+                    reason=rule.reason(),
+                    severity=rule.severity,
+                    stats=rule._window_stats(len(window_logs), end_ts),
+                    logs=window_logs,
+                )
+            )
+    return alerts
+
+
+def _logs(count: int, rng: random.Random, burst: int = 0) -> list[dict[str, Any]]:
+    logs = []
+    ts = 1_771_500_000_000
+    for i in range(count):
+        ts += rng.choice([0, 0, 5, 250, 1_000, 30_000, 600_000])
+        logs.append({
+            "id": i + 1,
+            "ts": ts if rng.random() > 0.02 else None,
+            "level": rng.choice(["INFO", "INFO", "WARN", "ERROR"]),
+            "message": rng.choice(["ok", "Exception in handler", "Failed status=404"]),
+        })
+    for i in range(burst):
+        # A tight burst of errors, all inside one window.
+        logs.append({"id": count + i + 1, "ts": ts + i, "level": "ERROR", "message": "Exception"})
+    rng.shuffle(logs)
+    return logs
+
+
+def _check_equivalence() -> None:
+    rng = random.Random(3)
+    for _ in range(200):
+        logs = _logs(rng.randint(0, 400), rng)
+        rules = [
+            ErrorCountRule(time_window_minutes=rng.choice([1, 2, 10]), threshold=rng.randint(1, 6)),
+            ErrorCountRule(time_window_seconds=rng.choice([0, 1, 10]), threshold=rng.randint(1, 4)),
+            KeywordMatchRule("Exception", time_window_minutes=rng.choice([1, 5]), threshold=rng.randint(1, 12)),
+        ]
+        for rule in rules:
+            if rule.evaluate(logs) != _legacy_evaluate(rule, logs):
+                raise SystemExit(f"sliding window differs from the legacy loop for {rule.name}")
+
+
+def main() -> None:
+    burst = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    _check_equivalence()
+    print("equivalence: sliding window matches the legacy loop")
+
+    logs = _logs(10_000, random.Random(5), burst=burst)
+    rule = ErrorCountRule(time_window_minutes=10, threshold=5)
+    runs = (
+        ("legacy loop", lambda: _legacy_evaluate(rule, logs)),
+        ("sliding window", lambda: rule.evaluate(logs)),
+    )
+    for label, evaluate in runs:
+        start = time.perf_counter()
+        alerts = evaluate()
+        print(f"{label:<15} {time.perf_counter() - start:8.3f} s  ({len(alerts)} alerts, burst of {burst:,})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Compares the BSON size of log chunks stored as one document per entry
+against the columnar encoding, per available codec, along with the time to
+encode and decode them. Every encoding is checked to decode back to the
+original entries.
+
+Run from the backend directory:
+    python -m benchmarks.chunk_encoding [line_count]
+"""
+import sys
+import time
+
+import bson
+
+from app.models.log_chunks import _COMPRESSORS, decode_entries, encode_entries
+from app.models.project import CHUNK_SIZE
+from app.parsers.log_parser import parse_log_text
+from app.parsers.templates import TemplateMiner
+from benchmarks.parser_throughput import _synthetic_lines
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    entries = list(TemplateMiner().assign(parse_log_text("\n".join(_synthetic_lines(count)))))
+    chunks = [entries[offset:offset + CHUNK_SIZE] for offset in range(0, len(entries), CHUNK_SIZE)]
+
+    row_bytes = sum(len(bson.encode({"entries": chunk})) for chunk in chunks)
+    print(f"{len(entries):,} entries in {len(chunks)} chunks")
+    print(f"  {'rows':<8} {row_bytes / 1e6:8.2f} MB")
+    for codec in _COMPRESSORS:
+        start = time.perf_counter()
+        encoded = [encode_entries(chunk, codec) for chunk in chunks]
+        encode_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        decoded = [decode_entries(chunk) for chunk in encoded]
+        decode_seconds = time.perf_counter() - start
+        if decoded != chunks:
+            raise SystemExit(f"{codec} chunks do not decode back to their entries")
+        size = sum(len(bson.encode(chunk)) for chunk in encoded)
+        print(
+            f"  {codec:<8} {size / 1e6:8.2f} MB  {row_bytes / size:5.1f}x smaller"
+            f"  encode {encode_seconds:6.2f} s  decode {decode_seconds:6.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Times EventTimeline.index_keywords on parsed log lines with the Aho-Corasick
+automaton forced on and off, for growing keyword counts, to place
+KEYWORD_AUTOMATON_MIN where the automaton starts to win. Both strategies are
+checked to find the same positions.
+
+Run from the backend directory:
+    python -m benchmarks.keyword_index [line_count]
+"""
+import sys
+
+import app.services.event_timeline as event_timeline
+from app.parsers.log_parser import parse_log_text
+from app.services.event_timeline import EventTimeline
+from benchmarks.parser_throughput import _synthetic_lines, _time
+from benchmarks.template_mining import _NOUNS, _VERBS
+
+
+def _keywords(count: int) -> list[str]:
+    # Half occur in the messages, half never do, as in typical rule sets.
+    present = [word for pair in zip(_VERBS, _NOUNS) for word in pair]
+    absent = [f"missing-{index}" for index in range(count)]
+    return [word for pair in zip(present * count, absent) for word in pair][:count]
+
+
+def _index(
+    timeline: EventTimeline, keywords: list[str], automaton_min: int
+) -> dict[str, list[int]]:
+    event_timeline.KEYWORD_AUTOMATON_MIN = automaton_min
+    timeline._by_keyword.clear()
+    timeline.index_keywords(keywords)
+    return {keyword: timeline.keyword_positions(keyword) for keyword in keywords}
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    timeline = EventTimeline(parse_log_text("\n".join(_synthetic_lines(count))))
+    print(f"{len(timeline):,} logs; index_keywords seconds (best of 3)")
+    print(f"  {'keywords':>8}  {'substring':>9}  {'automaton':>9}")
+    for keyword_count in (4, 8, 16, 24, 32, 48, 64, 96, 128):
+        keywords = _keywords(keyword_count)
+        substring_seconds, by_substring = _time(_index, timeline, keywords, sys.maxsize)
+        automaton_seconds, by_automaton = _time(_index, timeline, keywords, 1)
+        if by_substring != by_automaton:
+            raise SystemExit(f"strategies disagree at {keyword_count} keywords")
+        print(f"  {keyword_count:>8}  {substring_seconds:>9.3f}  {automaton_seconds:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
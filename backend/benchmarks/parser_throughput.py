@@ -0,0 +1,74 @@
+"""
+Compares the single-pass line grammar in `parse_log_text` against the
+per-field regex heuristics it replaced.
+
+Run from the backend directory:
+    python -m benchmarks.parser_throughput [line_count]
+"""
+import random
+import sys
+import time
+
+from app.parsers.log_parser import _parse_line_heuristic, parse_log_text
+
+
+_LEVELS = ["INFO", "INFO", "INFO", "DEBUG", "WARN", "ERROR"]
+_LOGGERS = ["c.e.demo.UserService", "o.s.web.servlet.DispatcherServlet", "c.e.demo.db.Pool"]
+_MESSAGES = [
+    "Completed request in 42 ms",
+    "Failed to load user 1834 status=404",
+    "Connection pool exhausted, waiting for connection",
+    "Starting scheduled job cleanup",
+]
+
+
+def _synthetic_lines(count: int) -> list[str]:
+    rng = random.Random(42)
+    lines = []
+    for i in range(count):
+        if i % 50 == 49:
+            # Lines outside the grammar exercise the heuristic fallback.
+            lines.append(f"2026-02-19 19:00 batch job {i} finished with WARN status")
+            continue
+        second = i % 60
+        lines.append(
+            f"2026-02-19 19:{(i // 60) % 60:02d}:{second:02d}.{i % 1000:03d} "
+            f"{rng.choice(_LEVELS):>5} 4821 --- [nio-8080-exec-{i % 10}] "
+            f"{rng.choice(_LOGGERS):<40} : {rng.choice(_MESSAGES)}"
+        )
+    return lines
+
+
+def _time(fn, *args, repeat: int = 3) -> tuple[float, object]:
+    # Best of `repeat` runs, to keep scheduler noise out of the comparison.
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _heuristic_parse(lines: list[str]) -> list[dict]:
+    return [_parse_line_heuristic(line, index) for index, line in enumerate(lines)]
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    lines = _synthetic_lines(count)
+    text = "\n".join(lines)
+
+    heuristic_seconds, expected = _time(_heuristic_parse, lines)
+    grammar_seconds, parsed = _time(parse_log_text, text)
+    if parsed != expected:
+        raise SystemExit("single-pass grammar output differs from the heuristics")
+
+    print(f"lines:            {count:,}")
+    print(f"per-field regex:  {count / heuristic_seconds:,.0f} lines/sec")
+    print(f"single-pass:      {count / grammar_seconds:,.0f} lines/sec")
+    print(f"speedup:          {heuristic_seconds / grammar_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Measures TemplateMiner throughput on synthetic messages drawn from a few
+hundred templates with variable parameters.
+
+Run from the backend directory:
+    python -m benchmarks.template_mining [message_count]
+"""
+import random
+import sys
+import time
+
+from app.parsers.templates import TemplateMiner
+
+
+_VERBS = ["Loaded", "Saved", "Deleted", "Updated", "Fetched", "Cached", "Rejected", "Retried"]
+_NOUNS = ["user", "order", "invoice", "session", "token", "cart", "payment", "report"]
+_SUFFIXES = [
+    "in {n} ms",
+    "for tenant {n} after {n} attempts",
+    "status={s}",
+    "from {ip}",
+    "with id {hex}",
+]
+
+
+def _synthetic_messages(count: int) -> list[str]:
+    rng = random.Random(7)
+    shapes = [
+        f"{verb} {noun} {rng.choice(_SUFFIXES)}"
+        for verb in _VERBS
+        for noun in _NOUNS
+        for _ in range(4)
+    ]
+    messages = []
+    for _ in range(count):
+        shape = rng.choice(shapes)
+        messages.append(
+            shape.replace("{n}", str(rng.randint(1, 99999)), 1)
+            .replace("{n}", str(rng.randint(1, 9)))
+            .replace("{s}", rng.choice(["200", "404", "500"]))
+            .replace("{ip}", f"10.0.{rng.randint(0, 255)}.{rng.randint(0, 255)}")
+            .replace("{hex}", f"{rng.getrandbits(64):016x}")
+        )
+    return messages
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    messages = _synthetic_messages(count)
+
+    miner = TemplateMiner()
+    add_message = miner.add_message
+    start = time.perf_counter()
+    for message in messages:
+        add_message(message)
+    seconds = time.perf_counter() - start
+
+    print(f"messages:   {count:,}")
+    print(f"templates:  {len(miner.templates()):,}")
+    print(f"elapsed:    {seconds:.2f} s")
+    print(f"throughput: {count / seconds:,.0f} messages/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
 from app import create_app
 
 
-app = create_app()
+# Pool workers are spawned, and a spawned process re-imports the parent's
+# main module as __mp_main__; it must not build an app (and connect to
+# MongoDB) of its own.
+if __name__ != "__mp_main__":
+    app = create_app()
 
 
 if __name__ == "__main__":
@@ -162,7 +162,7 @@ export default function CreateProjectForm({
             <input
               type="file"
               multiple
-              accept=".json,.txt,.log"
+              accept=".json,.txt,.log,.gz,.bz2,.xz,.zst"
               onChange={handleFileSelect}
               className="hidden"
               id="file-input"
@@ -1,5 +1,5 @@
 import { createFileRoute, useParams, Link } from "@tanstack/react-router";
-import { useState, useEffect, useMemo } from "react";
+import { useState, useEffect, useMemo, useCallback } from "react";
 import { ArrowLeft, Search, FileText, ChevronDown, ChevronRight, Download } from "lucide-react";
 
 export const Route = createFileRoute("/project-logs/$projectId")({
@@ -9,6 +9,8 @@ export const Route = createFileRoute("/project-logs/$projectId")({
 type LogLevel = "INFO" | "WARN" | "ERROR" | "DEBUG";
 
 type LogEntry = {
+    file_id: string;
+    id: number;
     level: LogLevel;
     message: string;
     timestamp?: string;
@@ -18,11 +20,21 @@ type LogEntry = {
 };
 
 type LogFile = {
+    file_id: string;
     filename: string;
     created_at: string;
-    logs: LogEntry[];
+    entry_count: number;
 };
 
+type LogPage = {
+    logs?: LogEntry[];
+    next_cursor?: string | null;
+};
+
+// Entries are fetched a page at a time and filtered by the backend.
+const PAGE_SIZE = 200;
+const SEARCH_DEBOUNCE_MS = 300;
+
 const LEVEL_STYLES: Record<LogLevel | string, { bg: string; text: string; border: string }> = {
     ERROR: { bg: "rgba(248,113,113,0.15)", text: "#f87171", border: "rgba(248,113,113,0.4)" },
     WARN: { bg: "rgba(251,191,36,0.15)", text: "#fbbf24", border: "rgba(251,191,36,0.4)" },
@@ -41,71 +53,148 @@ function getLogTimestamp(log: LogEntry): string {
     return "—";
 }
 
+// datetime-local values are local times; the API takes epoch milliseconds.
+function toEpochMs(value: string): string {
+    const ms = new Date(value).getTime();
+    return Number.isNaN(ms) ? "" : String(ms);
+}
+
 function ProjectLogsPage() {
     const { projectId } = useParams({ from: "/project-logs/$projectId" });
 
     const [files, setFiles] = useState<LogFile[]>([]);
+    const [logs, setLogs] = useState<LogEntry[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [error, setError] = useState<string | null>(null);
 
     // Filters
     const [levelFilter, setLevelFilter] = useState<string>("");
     const [keyword, setKeyword] = useState<string>("");
+    const [searchText, setSearchText] = useState<string>("");
     const [selectedFile, setSelectedFile] = useState<string>("");
+    const [startTime, setStartTime] = useState<string>("");
+    const [endTime, setEndTime] = useState<string>("");
 
     // Collapsed files
     const [collapsedFiles, setCollapsedFiles] = useState<Set<string>>(new Set());
 
     useEffect(() => {
         if (!projectId) return;
+        fetch(`/api/project/${projectId}/files`, { headers: getAuthHeaders() })
+            .then((res) => {
+                if (!res.ok) throw new Error(`HTTP ${res.status}`);
+                return res.json();
+            })
+            .then((data: { files?: LogFile[] }) => setFiles(data.files ?? []))
+            .catch((err) => console.error("Failed to load files:", err));
+    }, [projectId]);
+
+    // Only search once typing pauses, not on every keystroke.
+    useEffect(() => {
+        const timer = setTimeout(() => setSearchText(keyword.trim()), SEARCH_DEBOUNCE_MS);
+        return () => clearTimeout(timer);
+    }, [keyword]);
+
+    const pageUrl = useCallback(
+        (cursor: string | null) => {
+            const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+            if (cursor) params.set("cursor", cursor);
+            if (levelFilter) params.set("level", levelFilter);
+            if (selectedFile) params.set("file_id", selectedFile);
+            if (searchText) params.set("q", searchText);
+            if (startTime && toEpochMs(startTime)) params.set("start", toEpochMs(startTime));
+            if (endTime && toEpochMs(endTime)) params.set("end", toEpochMs(endTime));
+            return `/api/project/${projectId}/logs?${params}`;
+        },
+        [projectId, levelFilter, selectedFile, searchText, startTime, endTime]
+    );
+
+    // Any filter change starts over from the first page.
+    useEffect(() => {
+        if (!projectId) return;
+        const controller = new AbortController();
         setLoading(true);
-        fetch(`/api/project/${projectId}/logs`, { headers: getAuthHeaders() })
+        fetch(pageUrl(null), { headers: getAuthHeaders(), signal: controller.signal })
             .then((res) => {
                 if (!res.ok) throw new Error(`HTTP ${res.status}`);
                 return res.json();
             })
-            .then((data: { files?: LogFile[] }) => {
-                setFiles(data.files ?? []);
+            .then((data: LogPage) => {
+                setLogs(data.logs ?? []);
+                setNextCursor(data.next_cursor ?? null);
                 setError(null);
+                setLoading(false);
             })
             .catch((err) => {
+                if (controller.signal.aborted) return;
                 console.error(err);
                 setError("Failed to load logs. Please try again.");
-            })
-            .finally(() => setLoading(false));
-    }, [projectId]);
+                setLoading(false);
+            });
+        return () => controller.abort();
+    }, [projectId, pageUrl]);
 
-    const uniqueFiles = useMemo(() => files.map((f) => f.filename), [files]);
+    const loadMore = () => {
+        if (!nextCursor || loadingMore) return;
+        setLoadingMore(true);
+        fetch(pageUrl(nextCursor), { headers: getAuthHeaders() })
+            .then((res) => {
+                if (!res.ok) throw new Error(`HTTP ${res.status}`);
+                return res.json();
+            })
+            .then((data: LogPage) => {
+                setLogs((prev) => [...prev, ...(data.logs ?? [])]);
+                setNextCursor(data.next_cursor ?? null);
+            })
+            .catch((err) => {
+                console.error(err);
+                setError("Failed to load more logs. Please try again.");
+            })
+            .finally(() => setLoadingMore(false));
+    };
 
+    // Pages come back ordered by file, so each file's entries are contiguous.
     const filteredFiles = useMemo(() => {
-        return files
-            .filter((f) => !selectedFile || f.filename === selectedFile)
-            .map((f) => ({
-                ...f,
-                logs: f.logs.filter((log) => {
-                    const matchLevel = levelFilter ? log.level === levelFilter : true;
-                    const matchKeyword = keyword
-                        ? JSON.stringify(log).toLowerCase().includes(keyword.toLowerCase())
-                        : true;
-                    return matchLevel && matchKeyword;
-                }),
-            }))
-            .filter((f) => f.logs.length > 0 || (!levelFilter && !keyword));
-    }, [files, levelFilter, keyword, selectedFile]);
-
-    const totalFiltered = useMemo(
-        () => filteredFiles.reduce((sum, f) => sum + f.logs.length, 0),
-        [filteredFiles]
-    );
+        const byId = new Map(files.map((f) => [f.file_id, f]));
+        const groups: Array<LogFile & { logs: LogEntry[] }> = [];
+        logs.forEach((log) => {
+            const last = groups[groups.length - 1];
+            if (last && last.file_id === log.file_id) {
+                last.logs.push(log);
+                return;
+            }
+            const file = byId.get(log.file_id);
+            groups.push({
+                file_id: log.file_id,
+                filename: file?.filename ?? log.file_id,
+                created_at: file?.created_at ?? "",
+                entry_count: file?.entry_count ?? 0,
+                logs: [log],
+            });
+        });
+        return groups;
+    }, [files, logs]);
+
+    const hasFilters = Boolean(levelFilter || keyword || selectedFile || startTime || endTime);
 
-    const toggleFile = (filename: string) => {
+    const toggleFile = (fileId: string) => {
         setCollapsedFiles((prev) => {
             const next = new Set(prev);
-            next.has(filename) ? next.delete(filename) : next.add(filename);
+            next.has(fileId) ? next.delete(fileId) : next.add(fileId);
             return next;
         });
     };
 
+    const clearFilters = () => {
+        setLevelFilter("");
+        setKeyword("");
+        setSelectedFile("");
+        setStartTime("");
+        setEndTime("");
+    };
+
     const handleExportCSV = () => {
         const headers = ["Filename", "Timestamp", "Level", "Message"];
         const rows: string[] = [];
@@ -167,10 +256,12 @@ function ProjectLogsPage() {
                     {!loading && (
                         <div className="flex items-center gap-4 text-sm text-slate-400">
                             <span><span className="text-white font-semibold">{files.length}</span> files</span>
-                            <span><span className="text-white font-semibold">{totalFiltered}</span> entries shown</span>
+                            <span>
+                                <span className="text-white font-semibold">{logs.length}{nextCursor ? "+" : ""}</span> entries shown
+                            </span>
                             <button
                                 onClick={handleExportCSV}
-                                disabled={totalFiltered === 0}
+                                disabled={logs.length === 0}
                                 className="ml-2 flex items-center gap-2 px-3 py-1.5 border border-white/20 hover:bg-white/10 text-white rounded-lg transition disabled:opacity-50 disabled:cursor-not-allowed"
                             >
                                 <Download className="w-4 h-4" />
@@ -187,7 +278,7 @@ function ProjectLogsPage() {
                         <Search className="w-4 h-4 text-slate-400 flex-shrink-0" />
                         <input
                             type="text"
-                            placeholder="Search messages, fields..."
+                            placeholder="Search messages..."
                             value={keyword}
                             onChange={(e) => setKeyword(e.target.value)}
                             className="bg-transparent text-sm text-white placeholder-slate-500 outline-none w-full"
@@ -214,14 +305,30 @@ function ProjectLogsPage() {
                         className="bg-white/5 border border-white/10 rounded-xl px-3 py-2 text-sm text-gray-200 outline-none focus:border-indigo-500/50"
                     >
                         <option value="">All Files</option>
-                        {uniqueFiles.map((f) => (
-                            <option key={f} value={f}>{f}</option>
+                        {files.map((f) => (
+                            <option key={f.file_id} value={f.file_id}>{f.filename}</option>
                         ))}
                     </select>
 
-                    {(levelFilter || keyword || selectedFile) && (
+                    {/* Time range */}
+                    <input
+                        type="datetime-local"
+                        value={startTime}
+                        onChange={(e) => setStartTime(e.target.value)}
+                        title="From"
+                        className="bg-white/5 border border-white/10 rounded-xl px-3 py-2 text-sm text-gray-200 outline-none focus:border-indigo-500/50"
+                    />
+                    <input
+                        type="datetime-local"
+                        value={endTime}
+                        onChange={(e) => setEndTime(e.target.value)}
+                        title="To"
+                        className="bg-white/5 border border-white/10 rounded-xl px-3 py-2 text-sm text-gray-200 outline-none focus:border-indigo-500/50"
+                    />
+
+                    {hasFilters && (
                         <button
-                            onClick={() => { setLevelFilter(""); setKeyword(""); setSelectedFile(""); }}
+                            onClick={clearFilters}
                             className="px-4 py-2 rounded-xl text-sm text-slate-400 hover:text-white border border-white/10 hover:border-white/20 transition"
                         >
                             Clear filters
@@ -245,15 +352,15 @@ function ProjectLogsPage() {
                 ) : (
                     <div className="space-y-6">
                         {filteredFiles.map((file) => {
-                            const isCollapsed = collapsedFiles.has(file.filename);
+                            const isCollapsed = collapsedFiles.has(file.file_id);
                             return (
                                 <div
-                                    key={file.filename}
+                                    key={file.file_id}
                                     className="rounded-2xl border border-white/10 overflow-hidden bg-white/5 backdrop-blur-xl shadow-xl"
                                 >
                                     {/* File header */}
                                     <button
-                                        onClick={() => toggleFile(file.filename)}
+                                        onClick={() => toggleFile(file.file_id)}
                                         className="w-full flex items-center justify-between px-5 py-4 hover:bg-white/5 transition"
                                     >
                                         <div className="flex items-center gap-3">
@@ -263,12 +370,14 @@ function ProjectLogsPage() {
                                             }
                                             <FileText className="w-4 h-4 text-blue-400" />
                                             <span className="font-semibold text-white">{file.filename}</span>
-                                            <span className="text-xs text-slate-500">
-                                                uploaded {new Date(file.created_at).toLocaleString()}
-                                            </span>
+                                            {file.created_at && (
+                                                <span className="text-xs text-slate-500">
+                                                    uploaded {new Date(file.created_at).toLocaleString()}
+                                                </span>
+                                            )}
                                         </div>
                                         <span className="text-xs text-slate-400 bg-white/10 px-2 py-1 rounded-full">
-                                            {file.logs.length} entries
+                                            {file.logs.length} of {file.entry_count} entries
                                         </span>
                                     </button>
 
@@ -288,7 +397,7 @@ function ProjectLogsPage() {
                                                         const style = LEVEL_STYLES[log.level] ?? LEVEL_STYLES["INFO"];
                                                         return (
                                                             <tr
-                                                                key={idx}
+                                                                key={log.id ?? idx}
                                                                 className="border-b border-white/5 hover:bg-white/5 transition"
                                                             >
                                                                 <td className="px-5 py-2.5 font-mono text-xs text-slate-400 whitespace-nowrap">
@@ -319,6 +428,17 @@ function ProjectLogsPage() {
                                 </div>
                             );
                         })}
+                        {nextCursor && (
+                            <div className="flex justify-center">
+                                <button
+                                    onClick={loadMore}
+                                    disabled={loadingMore}
+                                    className="px-4 py-2 rounded-xl text-sm text-slate-300 hover:text-white border border-white/10 hover:border-white/20 transition disabled:opacity-50 disabled:cursor-not-allowed"
+                                >
+                                    {loadingMore ? "Loading..." : "Load more"}
+                                </button>
+                            </div>
+                        )}
                     </div>
                 )}
             </div>
@@ -17,13 +17,17 @@ import ReactMarkdown from "react-markdown";
 
 type Level = "INFO" | "WARN" | "ERROR" | "DEBUG";
 
-type LogType = {
-  level: Level;
-  message: string;
-  timestamp?: string;
-  date?: string;
-  time?: string;
-  [key: string]: unknown;
+// Bucketed entry counts from the stats endpoint (rollups kept at ingest).
+type StatsBucket = {
+  start: number;
+  count: number;
+  levels: Partial<Record<Level, number>>;
+};
+
+type StatsType = {
+  granularity: "minute" | "hour";
+  totals: { count: number; levels: Partial<Record<Level, number>> };
+  buckets: StatsBucket[];
 };
 
 // Matches actual backend Alert shape from alert_engine.py
@@ -36,7 +40,8 @@ type AlertType = {
     time_window_minutes: number;
     latest_timestamp: string;
   };
-  logs: LogType[];
+  log_refs: Array<{ file_id: string | null; ranges: Array<[number, number]> }>;
+  example_message: string;
 };
 
 type ChatMessage = {
@@ -72,6 +77,9 @@ const SEVERITY_COLOR: Record<string, string> = {
 
 const LEVELS: Level[] = ["INFO", "WARN", "ERROR", "DEBUG"];
 
+// Projects spanning at most this many hours are charted per minute.
+const MINUTE_CHART_MAX_HOURS = 6;
+
 export const Route = createFileRoute("/project/$projectId")({
   component: ProjectDashboard,
 });
@@ -81,10 +89,24 @@ function getAuthHeaders(): HeadersInit {
   return token ? { Authorization: `Bearer ${token}` } : {};
 }
 
+function fetchStats(projectId: string, granularity: "minute" | "hour"): Promise<StatsType> {
+  return fetch(`/api/project/${projectId}/stats?granularity=${granularity}`, {
+    headers: getAuthHeaders(),
+  }).then((res) => {
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    return res.json();
+  });
+}
+
+// Bucket starts are epoch milliseconds; label them in UTC like the log times.
+function formatBucket(start: number): string {
+  return new Date(start).toISOString().slice(0, 16).replace("T", " ");
+}
+
 function ProjectDashboard() {
   const { projectId } = useParams({ from: "/project/$projectId" });
 
-  const [logs, setLogs] = useState<LogType[]>([]);
+  const [stats, setStats] = useState<StatsType | null>(null);
   const [alerts, setAlerts] = useState<AlertType[]>([]);
   const [selectedLevel, setSelectedLevel] = useState<"ALL" | Level>("ALL");
 
@@ -94,16 +116,15 @@ function ProjectDashboard() {
   const [chatLoading, setChatLoading] = useState(false);
   const chatEndRef = useRef<HTMLDivElement>(null);
 
-  // Fetch logs
+  // Fetch entry counts
   useEffect(() => {
     if (!projectId) return;
-    fetch(`/api/project/${projectId}/logs`, { headers: getAuthHeaders() })
-      .then((res) => res.json())
-      .then((data: { files?: Array<{ logs: LogType[] }> }) => {
-        const allLogs = (data.files ?? []).flatMap((f) => f.logs ?? []);
-        setLogs(allLogs);
-      })
-      .catch((err) => console.error("Failed to load logs:", err));
+    fetchStats(projectId, "hour")
+      .then((hourly) =>
+        hourly.buckets.length <= MINUTE_CHART_MAX_HOURS ? fetchStats(projectId, "minute") : hourly
+      )
+      .then(setStats)
+      .catch((err) => console.error("Failed to load stats:", err));
   }, [projectId]);
 
   // Fetch alerts
@@ -124,32 +145,19 @@ function ProjectDashboard() {
 
   // Pie chart data
   const pieData: PieDataType[] = useMemo(() => {
-    const counts: Record<Level, number> = { INFO: 0, WARN: 0, ERROR: 0, DEBUG: 0 };
-    logs.forEach((log) => {
-      if (log.level && counts[log.level] !== undefined) counts[log.level] += 1;
-    });
-    return LEVELS.map((level) => ({ name: level, value: counts[level] }));
-  }, [logs]);
+    const levels = stats?.totals.levels ?? {};
+    return LEVELS.map((level) => ({ name: level, value: levels[level] ?? 0 }));
+  }, [stats]);
 
-  // Line chart data — group by date+time bucket
+  // Line chart data — one point per stats bucket, already in time order
   const lineData: LineDataType[] = useMemo(() => {
-    const timeMap: Record<string, LineDataType> = {};
-    logs.forEach((log) => {
-      const key = log.date
-        ? `${log.date} ${(log.time ?? "").slice(0, 5)}`
-        : (log.timestamp ?? "").slice(0, 16);
-      if (!key) return;
-      if (!timeMap[key]) {
-        timeMap[key] = { time: key, INFO: 0, WARN: 0, ERROR: 0, DEBUG: 0 };
-      }
-      if (log.level && timeMap[key][log.level] !== undefined) {
-        timeMap[key][log.level] += 1;
-      }
-    });
-
-    const data = Object.values(timeMap).sort((a, b) =>
-      a.time.localeCompare(b.time)
-    );
+    const data = (stats?.buckets ?? []).map((bucket) => ({
+      time: formatBucket(bucket.start),
+      INFO: bucket.levels.INFO ?? 0,
+      WARN: bucket.levels.WARN ?? 0,
+      ERROR: bucket.levels.ERROR ?? 0,
+      DEBUG: bucket.levels.DEBUG ?? 0,
+    }));
 
     if (selectedLevel === "ALL") return data;
 
@@ -160,7 +168,7 @@ function ProjectDashboard() {
       ERROR: selectedLevel === "ERROR" ? entry.ERROR : 0,
       DEBUG: selectedLevel === "DEBUG" ? entry.DEBUG : 0,
     }));
-  }, [logs, selectedLevel]);
+  }, [stats, selectedLevel]);
 
   // Severe alerts sorted by severity (HIGH first, then MEDIUM, then LOW, then by timestamp desc)
   const topSevereAlerts = useMemo(() => {
@@ -233,7 +241,7 @@ function ProjectDashboard() {
           <p className="text-slate-400 mt-2 font-mono text-sm">ID: {projectId}</p>
         </div>
         <div className="flex gap-3 items-center">
-          <span className="text-slate-400 text-sm">{logs.length} log entries</span>
+          <span className="text-slate-400 text-sm">{stats?.totals.count ?? 0} log entries</span>
           <span
             className="px-3 py-1 rounded-full text-xs font-bold"
             style={{ background: "rgba(248,113,113,0.15)", color: "#f87171", border: "1px solid rgba(248,113,113,0.3)" }}